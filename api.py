@@ -14,49 +14,129 @@ FastAPI backend with:
 """
 
 import os
+import base64
+import hashlib
+import hmac
+import orjson
 import uuid
+import shutil
+import asyncio
 import traceback
+from contextlib import asynccontextmanager
 from datetime import datetime
 from fastapi import FastAPI, UploadFile, File, HTTPException, BackgroundTasks
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.responses import ORJSONResponse, Response, StreamingResponse
+from pydantic import BaseModel, ConfigDict
 from typing import Optional, List, Any
+from dotenv import load_dotenv
+
+# .env settings must be in the environment before the modules below read theirs
+load_dotenv()
 
 # ----------------------------
 # Core system imports
 # ----------------------------
 from db.validator import validate_sqlite_db
-from db.schema_extractor import extract_schema
 from db.schema_cache import SchemaCache
+from db.pool import close_pool
 from session.session_manager import Session
+from session.store import SessionStore, remove_db_file
+from schema.compactor import compact_schema
 
 from nlp.context_builder import build_context
 from nlp.ambiguity_detector import detect_ambiguity
 from nlp.intent_merger import merge_intent
 from nlp.meta_handler import detect_meta_query, handle_meta_query
 from nlp.classifier import classify_intent
-from schema.refiner import refine_schema
-from nlp.planner import create_plan
-from nlp.suggestion_generator import generate_initial_questions, generate_related_questions
+from nlp.suggestion_generator import agenerate_upload_insights, generate_related_questions
 
-from llm.client import GroqClient
-from llm.sql_generator import generate_sql_with_reasoning, SQLGenerationError
-from llm.self_correction import QueryCorrector, generate_retry_prompt
+from llm.client import get_groq_client
+from llm.sql_generator import agenerate_sql_with_reasoning, SQLGenerationError
+from llm.self_correction import generate_retry_prompt
+from llm.disk_cache import LLM_DISK_CACHE
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, backoff_delay
 
 from validation.sql_validator import validate_sql, SQLValidationError
-from db.executor import execute_sql, SQLExecutionError
+from db.executor import SQLExecutionError, to_arrow_ipc
 from response.interpreter import interpret
-from response.answer_generator import generate_final_answer
+from response.answer_generator import agenerate_final_answer, stream_final_answer
 from response.general_chat import handle_general_chat
 
 
 # ----------------------------
 # App & global state
 # ----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Pay first-call costs at startup instead of on the first question
+    warmup_tasks = [
+        asyncio.create_task(asyncio.to_thread(_warmup)),
+        asyncio.create_task(_awarmup())
+    ]
+    sweeper_task = asyncio.create_task(_sweep_sessions())
+    yield
+    for task in warmup_tasks:
+        task.cancel()
+    sweeper_task.cancel()
+    # Sessions do not survive a restart, so their uploads would be orphaned
+    await asyncio.to_thread(SESSIONS.clear)
+    # Release the pooled LLM connections on shutdown
+    llm.close()
+    await llm.aclose()
+    LLM_DISK_CACHE.close()
+
+
+async def _sweep_sessions():
+    """Evicts idle sessions (and their files) even when no requests arrive."""
+    while True:
+        await asyncio.sleep(SESSION_SWEEP_INTERVAL)
+        await asyncio.to_thread(SESSIONS.sweep)
+
+
+def _warmup():
+    """Exercises the per-question helpers once and opens the LLM connection."""
+    validate_sql("SELECT 1")
+    detect_meta_query("what tables are there")
+    detect_ambiguity("show recent orders")
+    classify_intent(llm, "hi")
+    try:
+        llm.warmup()
+    except Exception as e:
+        print(f"[WARN] LLM warmup failed: {type(e).__name__}: {e}")
+
+
+async def _awarmup():
+    """Opens the async LLM client's connection pool (separate from the sync one)."""
+    try:
+        await llm.awarmup()
+    except Exception as e:
+        print(f"[WARN] Async LLM warmup failed: {type(e).__name__}: {e}")
+
+
+def _json_default(obj: Any) -> str:
+    """orjson fallback for values it cannot encode natively (BLOB columns etc.)."""
+    if isinstance(obj, (bytes, bytearray, memoryview)):
+        return bytes(obj).decode("utf-8", errors="replace")
+    return str(obj)
+
+
+class DataResponse(ORJSONResponse):
+    """
+    orjson response for result payloads. Endpoints return it directly so
+    FastAPI skips its jsonable_encoder walk over every row.
+    """
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, default=_json_default, option=orjson.OPT_NON_STR_KEYS)
+
+
 app = FastAPI(
     title="NL → SQL Assistant",
     description="Natural Language to SQL query system with reasoning and self-correction",
-    version="2.0.0"
+    version="2.0.0",
+    default_response_class=DataResponse,
+    lifespan=lifespan
 )
 
 app.add_middleware(
@@ -68,37 +148,103 @@ app.add_middleware(
 )
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-UPLOAD_DIR = os.path.join(BASE_DIR, "uploaded_dbs")
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(BASE_DIR, "uploaded_dbs"))
 os.makedirs(UPLOAD_DIR, exist_ok=True)
+UPLOAD_CHUNK_SIZE = 1 << 20  # 1 MB
+
+# Simple fixes at or above this confidence are tried before paying for a
+# speculative LLM regeneration
+CONFIDENT_FIX = 0.8
+
+# Rows returned per response; the rest is fetched with `next_cursor`
+ROWS_PAGE_SIZE = 200
+
+# Signs pagination cursors so clients cannot put their own SQL in one. Set
+# CURSOR_SECRET when running several workers so any worker accepts a cursor
+CURSOR_SECRET = os.getenv("CURSOR_SECRET", "").encode() or os.urandom(32)
+
+# Upper bound for one optional LLM step (seconds) before it is retried
+LLM_STEP_TIMEOUT = 10.0
+
+# Most questions accepted by one /ask-batch call
+MAX_BATCH_QUESTIONS = 20
+
+if os.getenv("SESSION_BACKEND", "memory") == "redis":
+    # Shared registry so any worker can serve any session (needs a shared UPLOAD_DIR)
+    from session.redis_store import RedisSessionStore
+    SESSIONS = RedisSessionStore(os.getenv("REDIS_URL", "redis://localhost:6379/0"))
+else:
+    SESSIONS = SessionStore()
+SESSION_SWEEP_INTERVAL = 300  # seconds
 
-SESSIONS: dict[str, Session] = {}
-llm = GroqClient()
+# Validated + extracted schemas by upload content digest
+SCHEMAS = SchemaCache()
+
+# (session_id, question) -> running pipeline, for deduplicating repeats
+INFLIGHT: dict[tuple[str, str], asyncio.Task] = {}
+llm = get_groq_client()
 MAX_RETRIES = 2
 
+# Deadline for one SQL-generation call, and the breaker that stops calling
+# the provider after repeated failures (format errors don't count)
+SQL_GEN_TIMEOUT = 30.0
+LLM_BREAKER = CircuitBreaker(fail_max=5, reset_timeout=30.0, exclude=(SQLGenerationError,))
+DEGRADED_ANSWER = "The language model is temporarily unavailable. Please try again in a moment."
+
 
 # ----------------------------
 # Request/Response models
 # ----------------------------
 class QuestionRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True)
+
     session_id: str
     question: str
     is_clarification: bool = False
 
+class BatchQuestionRequest(BaseModel):
+    model_config = ConfigDict(frozen=True, str_strip_whitespace=True)
+
+    session_id: str
+    questions: List[str]
+
 class UploadResponse(BaseModel):
+    model_config = ConfigDict(frozen=True)
+
     session_id: str
     tables: List[str]
     table_count: int
     message: str
     initial_questions: List[str] = []
+    summary: str = ""
+
+
+class ReasoningLog(list):
+    """
+    Reasoning steps collected for the response.
+    When an event queue is attached, every step is also pushed to it as it happens.
+    """
+
+    def __init__(self, events: Optional[asyncio.Queue] = None):
+        super().__init__()
+        self.events = events
+
+    def append(self, step: dict):
+        super().append(step)
+        if self.events is not None:
+            self.events.put_nowait({"type": "step", **step})
 
 
 # ============================================================
 # 1️⃣ DB UPLOAD (ONCE PER SESSION)
 # ============================================================
 @app.post("/upload-db", response_model=UploadResponse)
-async def upload_db(file: UploadFile = File(...)):
+async def upload_db(background_tasks: BackgroundTasks, file: UploadFile = File(...)):
     """
-    Upload a SQLite database, create session, and generate initial questions.
+    Upload a SQLite database and create a session.
+
+    Initial questions are generated in the background; poll
+    `/session/{session_id}/warm` for them.
     """
 
     if not file.filename:
@@ -111,51 +257,115 @@ async def upload_db(file: UploadFile = File(...)):
     db_path = os.path.join(UPLOAD_DIR, f"{session_id}.sqlite")
 
     try:
-        content = await file.read()
-        with open(db_path, "wb") as f:
-            f.write(content)
+        digest = await asyncio.to_thread(_save_upload, file.file, db_path)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to save file: {str(e)}")
 
     try:
-        validate_sqlite_db(db_path)
-        schema = extract_schema(db_path)
+        # Re-uploads of the same file skip validation and introspection
+        schema = await asyncio.to_thread(SCHEMAS.load_for, db_path, digest, validate_sqlite_db)
     except Exception as e:
+        close_pool(db_path)
         if os.path.exists(db_path):
             os.remove(db_path)
         raise HTTPException(status_code=400, detail=f"Invalid database: {str(e)}")
-    
-    cache = SchemaCache()
-    cache.load(schema)
 
-    session = Session(db_path=db_path, schema=cache.get())
-    SESSIONS[session_id] = session
+    session = Session(db_path=db_path, schema=schema)
+    await SESSIONS.aset(session_id, session)
 
-    # Generate initial questions based on schema
-    try:
-        initial_questions = generate_initial_questions(llm, schema)
-    except:
-        initial_questions = []
+    # Starter questions and warm-up run after the response is sent; the
+    # frontend picks them up from /session/{id}/warm
+    background_tasks.add_task(_warm_session, session_id, session)
 
     return UploadResponse(
         session_id=session_id,
         tables=list(schema.keys()),
         table_count=len(schema),
-        message="Database uploaded successfully.",
-        initial_questions=initial_questions
+        message="Database uploaded successfully."
     )
 
 
+class _HashingReader:
+    """File wrapper that digests everything read through it."""
+
+    def __init__(self, raw):
+        self.raw = raw
+        self.hash = hashlib.blake2b(digest_size=16)
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.raw.read(size)
+        self.hash.update(chunk)
+        return chunk
+
+
+def _save_upload(src, db_path: str) -> bytes:
+    """
+    Copies the spooled upload to disk in chunks, so the whole DB is never
+    held in memory, in one worker thread rather than one hop per chunk.
+
+    Returns:
+        bytes: Content digest of the upload (schema cache key)
+    """
+    src.seek(0)
+    reader = _HashingReader(src)
+    with open(db_path, "wb") as f:
+        shutil.copyfileobj(reader, f, UPLOAD_CHUNK_SIZE)
+    return reader.hash.digest()
+
+
+async def _with_timeout(fn, *args, timeout: float = LLM_STEP_TIMEOUT, retries: int = 1):
+    """
+    Awaits an async LLM helper, cancelling it after `timeout` seconds and
+    retrying up to `retries` more times on timeout. The helper must be a
+    coroutine function so cancellation also aborts its HTTP request; a
+    thread cannot be cancelled and would leave the timed-out call running
+    alongside the retry.
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await asyncio.wait_for(fn(*args), timeout=timeout)
+        except asyncio.TimeoutError:
+            if attempt == retries:
+                raise
+
+
+async def _warm_session(session_id: str, session: Session):
+    """
+    Fills `session.warm_state` after upload: summary, starter questions and
+    likely follow-ups (one LLM call), plus a warmed schema-refinement cache.
+    """
+    try:
+        insights = await _with_timeout(agenerate_upload_insights, llm, session.full_schema)
+    except Exception as e:
+        print(f"[WARN] Upload insights failed: {type(e).__name__}: {e}")
+        insights = {"summary": "", "initial_questions": [], "warm_examples": []}
+
+    for question in insights["initial_questions"]:
+        session.refine_schema(question)
+
+    session.warm_state.update(insights, ready=True)
+
+    # Republish so a shared session store carries the warm state too
+    if await SESSIONS.aget(session_id) is session:
+        await SESSIONS.aset(session_id, session)
+
+
 # ============================================================
 # 2️⃣ ASK QUESTIONS (CHAT LOOP)
 # ============================================================
 @app.post("/ask")
-def ask_question(req: QuestionRequest):
+async def ask_question(req: QuestionRequest, stream: bool = False):
     """
     Process a natural language question.
+
+    With `?stream=true` the response is a Server-Sent Events stream: one
+    `step` event per reasoning step, a `rows` event with the SQL and first
+    page of results once the query has run, `token` events while the final
+    answer is generated, then a single `result` event carrying the usual
+    JSON payload.
     """
 
-    session = SESSIONS.get(req.session_id)
+    session = await SESSIONS.aget(req.session_id)
     if not session:
         raise HTTPException(status_code=404, detail="Invalid session_id")
 
@@ -163,13 +373,100 @@ def ask_question(req: QuestionRequest):
     if not user_input:
         raise HTTPException(status_code=400, detail="Question cannot be empty")
 
+    if not stream:
+        return DataResponse(await _answer_once(req.session_id, session, user_input))
+
+    events: asyncio.Queue = asyncio.Queue()
+
+    async def publish():
+        try:
+            result = await _answer_once(req.session_id, session, user_input, events)
+        except Exception as e:
+            result = {"answer": "Error occurred.", "error": f"{type(e).__name__}: {str(e)}", "reasoning_steps": []}
+        events.put_nowait({"type": "result", **result})
+
+    async def event_generator():
+        task = asyncio.create_task(publish())
+        try:
+            while True:
+                event = await events.get()
+                yield b"data: " + orjson.dumps(event, default=_json_default) + b"\n\n"
+                if event["type"] == "result":
+                    break
+        finally:
+            # Client went away before the pipeline finished
+            if not task.done():
+                task.cancel()
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream")
+
+
+@app.post("/ask/stream")
+async def ask_question_stream(req: QuestionRequest):
+    """Same as `/ask?stream=true`."""
+    return await ask_question(req, stream=True)
+
+
+@app.post("/ask-batch")
+async def ask_batch(req: BatchQuestionRequest):
+    """
+    Answers several questions in one request, in order, as if each had been
+    sent to /ask one after another. Returns one /ask payload per question;
+    a question that fails gets an `error` entry instead of failing the batch.
+    """
+
+    session = await SESSIONS.aget(req.session_id)
+    if not session:
+        raise HTTPException(status_code=404, detail="Invalid session_id")
+
+    questions = [q.strip() for q in req.questions if q.strip()]
+    if not questions:
+        raise HTTPException(status_code=400, detail="Questions cannot be empty")
+    if len(questions) > MAX_BATCH_QUESTIONS:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUESTIONS} questions per batch")
+
+    results = []
+    for question in questions:
+        try:
+            results.append(await _answer_once(req.session_id, session, question))
+        except Exception as e:
+            results.append({"answer": "Error occurred.", "error": f"{type(e).__name__}: {str(e)}", "reasoning_steps": []})
+    return DataResponse({"results": results})
+
+
+async def _answer_once(session_id: str, session: Session, user_input: str, events: Optional[asyncio.Queue] = None) -> dict:
+    """
+    Runs the pipeline for a question, sharing the run with identical
+    questions already in flight on the same session (double clicks,
+    client retries). Late callers only receive the final result.
+    """
+    key = (session_id, user_input)
+    task = INFLIGHT.get(key)
+
+    if task is None:
+        async def run():
+            async with SESSIONS.turn(session_id, session):
+                return await _answer_question(session, user_input, events)
+
+        task = asyncio.create_task(run())
+        INFLIGHT[key] = task
+        task.add_done_callback(lambda _: INFLIGHT.pop(key, None))
+
+    # Shielded so one caller disconnecting does not cancel the shared run
+    return await asyncio.shield(task)
+
+
+async def _answer_question(session: Session, user_input: str, events: Optional[asyncio.Queue] = None) -> dict:
+    """
+    Runs the question pipeline for one session.
+
+    Blocking helpers (LLM round-trips, SQLite I/O) run in worker threads so the
+    event loop stays free, and independent steps are overlapped with asyncio.gather.
+    """
+
+    suggestions_task = None
     try:
-        reasoning_steps = []
-        
-        # ------------------------------------------------
-        # Generate Suggestions (Parallel if async, but here sequential)
-        # ------------------------------------------------
-        # We'll generate suggestions at the END, but preparing context here.
+        reasoning_steps = ReasoningLog(events)
         
         # ... [Meta-Query Check] ...
         is_meta, meta_type, target_table = detect_meta_query(user_input)
@@ -189,23 +486,18 @@ def ask_question(req: QuestionRequest):
                 "suggestions": [] # No suggestions for meta queries typically
             }
         
-        # ... [Intent Classification] ...
+        # ... [Response Cache] ...
+        # Repeats of an earlier question in the same conversation state skip
+        # every LLM and DB call
+        cache_key = None
         if not session.clarification_state:
-            intent, _ = classify_intent(llm, user_input)
-            if intent == "GENERAL_CHAT":
-                reasoning_steps.append({
-                    "icon": "💬",
-                    "text": "General conversation detected",
-                    "status": "complete"
-                })
-                result = handle_general_chat(llm, user_input, session.full_schema)
+            cache_key = session.response_cache_key(user_input)
+            cached = session.response_cache.get(cache_key)
+            if cached is not None:
+                reasoning_steps.append({"icon": "⚡", "text": "Answered from cache", "status": "complete"})
                 session.add_user_message(user_input)
-                session.add_system_message(result["answer"])
-                return {
-                    **result, 
-                    "reasoning_steps": reasoning_steps,
-                    "suggestions": [] # Could generate chat suggestions
-                }
+                session.add_system_message(cached["answer"])
+                return {**cached, "reasoning_steps": reasoning_steps, "cached": True}
 
         # ... [Clarification] ...
         resolving_clarification = False
@@ -217,46 +509,92 @@ def ask_question(req: QuestionRequest):
         else:
             user_query = user_input
 
-        session.add_user_message(user_query)
-        context = build_context(session.get_chat_history())
+        # Context includes the current question, as it will once it is recorded
+        context = build_context([*session.get_chat_history(), {"role": "user", "content": user_query}])
         enriched_query = f"Conversation context:\n{context}\n\nCurrent question:\n{user_query}"
 
-        # ... [Ambiguity] ...
-        if not resolving_clarification:
-            ambiguous, data = detect_ambiguity(enriched_query)
+        if resolving_clarification:
+            refined_schema = await asyncio.to_thread(session.refine_schema, enriched_query)
+        else:
+            # ... [Intent Classification | Ambiguity | Schema Refinement] ...
+            # The LLM intent call is the slow branch; the local checks and a
+            # speculative schema refinement run alongside it.
+            (intent, _), (ambiguous, data), refined_schema = await asyncio.gather(
+                asyncio.to_thread(classify_intent, llm, user_input),
+                asyncio.to_thread(detect_ambiguity, enriched_query),
+                asyncio.to_thread(session.refine_schema, enriched_query),
+            )
+
+            if intent == "GENERAL_CHAT":
+                reasoning_steps.append({
+                    "icon": "💬",
+                    "text": "General conversation detected",
+                    "status": "complete"
+                })
+                result = await asyncio.to_thread(handle_general_chat, llm, user_input, session.full_schema)
+                session.add_user_message(user_input)
+                session.add_system_message(result["answer"])
+                return {
+                    **result, 
+                    "reasoning_steps": reasoning_steps,
+                    "suggestions": [] # Could generate chat suggestions
+                }
+
             if ambiguous:
+                session.add_user_message(user_query)
                 reasoning_steps.append({"icon": "⚠️", "text": f"Ambiguity: '{data['term']}'", "status": "complete"})
                 data["original_query"] = enriched_query
                 session.clarification_state = data
                 session.add_system_message(data["question"])
                 return {"clarification": data["question"], "term": data.get("term"), "options": data.get("options", []), "reasoning_steps": reasoning_steps}
 
-        # ... [Schema Refinement] ...
+        session.add_user_message(user_query)
+
+        # Follow-up suggestions only depend on the question, so start them now
+        # and collect the result when assembling the response.
+        suggestions_task = asyncio.create_task(
+            asyncio.to_thread(generate_related_questions, llm, user_query, refined_schema)
+        )
+
         reasoning_steps.append({"icon": "📊", "text": "Analyzing schema context...", "status": "complete"})
-        refined_schema = refine_schema(session.full_schema, enriched_query)
         
         # ... [Planning] ...
-        plan = create_plan(user_query, refined_schema)
+        plan = session.create_plan(user_query, refined_schema)
         # Add varied reasoning steps for UI
         if plan.get("needs_join"): reasoning_steps.append({"icon": "🔗", "text": "JOIN required", "status": "complete"})
         if plan.get("aggregation"): reasoning_steps.append({"icon": "📈", "text": f"Aggregation: {plan['aggregation']}", "status": "complete"})
         reasoning_steps.append({"icon": "🎯", "text": f"Strategy: {plan['complexity'].upper()} query", "status": "complete"})
 
         # ... [Initial Generation] ...
+        # Open (or reuse) the session's connection while the LLM writes SQL
+        warmup_task = asyncio.create_task(asyncio.to_thread(session.pool.warm))
+
         reasoning_steps.append({"icon": "⚙️", "text": "Generating SQL...", "status": "complete"})
         try:
-            gen_res = generate_sql_with_reasoning(llm, plan, refined_schema, enriched_query)
+            # First attempt sees a trimmed schema (tables the question names are
+            # kept whole, see compact_schema); retries after an error get the
+            # full refined one
+            gen_res = await _generate_sql(session, plan, compact_schema(refined_schema, enriched_query), enriched_query)
             sql = gen_res["sql"]
-            llm_reasoning = gen_res["reasoning"]
+            sql_cache_key = gen_res.get("cache_key")
+            reasoning_parts = [gen_res["reasoning"]]
+        except CircuitOpenError as e:
+            reasoning_steps.append({"icon": "⛔", "text": "LLM unavailable", "status": "error"})
+            return {"answer": DEGRADED_ANSWER, "error": str(e), "reasoning_steps": reasoning_steps}
         except SQLGenerationError as e:
             # Fallback to empty SQL to trigger the retry loop with a format error
             sql = ""
-            llm_reasoning = f"Initial generation failed: {str(e)}"
+            sql_cache_key = None
+            reasoning_parts = [f"Initial generation failed: {str(e)}"]
             reasoning_steps.append({"icon": "⚠️", "text": "Initial generation failed, will retry...", "status": "error"})
         
         # ... [Execution & Validation Loop] ...
         reasoning_steps.append({"icon": "🚀", "text": "Starting execution loop...", "status": "complete"})
-        corrector = QueryCorrector(session.full_schema)
+        corrector = session.corrector
+        try:
+            await warmup_task
+        except Exception:
+            pass  # the first execute reports the error
         attempts = []
         exec_result = None
         current_sql = sql
@@ -270,12 +608,16 @@ def ask_question(req: QuestionRequest):
                 
                 # 2. Execute query
                 reasoning_steps.append({"icon": "🚀", "text": "Executing query...", "status": "complete"})
-                exec_result = execute_sql(session.db_path, current_sql)
+                exec_result = await session.aexecute_sql(current_sql)
                 break
                 
             except (SQLValidationError, SQLExecutionError) as e:
                 error_msg = str(e)
                 attempts.append({"sql": current_sql, "error": error_msg})
+                if sql_cache_key is not None:
+                    # Don't serve this SQL again from the persistent cache
+                    await asyncio.to_thread(LLM_DISK_CACHE.discard, sql_cache_key)
+                    sql_cache_key = None
                 
                 if attempt < MAX_RETRIES:
                     fix = corrector.analyze_error(error_msg, current_sql)
@@ -287,49 +629,77 @@ def ask_question(req: QuestionRequest):
                     })
                     
                     if fix.get("can_retry"):
-                        # Try simple fix first
+                        retry_prompt_text = generate_retry_prompt(
+                            user_query, 
+                            current_sql, 
+                            error_msg, 
+                            fix, 
+                            refined_schema,
+                            blocks=session.retry_schema_blocks
+                        )
+                        def regenerate(retry_context=retry_prompt_text):
+                            return asyncio.create_task(_generate_sql(
+                                session,
+                                plan, 
+                                refined_schema, 
+                                enriched_query,
+                                retry_context=retry_context
+                            ))
+
                         fixed_sql = corrector.apply_fix(current_sql, fix)
+                        has_fix = bool(fixed_sql) and fixed_sql != current_sql
+
+                        # Unless the simple fix is near-certain, start the LLM
+                        # regeneration right away so it overlaps with trying the
+                        # fix; it is dropped if the fix works
+                        regen_task = None
+                        if not has_fix or fix.get("confidence", 0.0) < CONFIDENT_FIX:
+                            regen_task = regenerate()
                         
-                        if fixed_sql and fixed_sql != current_sql:
-                            # Simple fix worked
-                            current_sql = fixed_sql
+                        if has_fix:
                             reasoning_steps.append({
                                 "icon": "🔧", 
                                 "text": f"Applied fix: {fix.get('fix_hint', 'Auto-correction')[:50]}", 
                                 "status": "complete"
                             })
-                        else:
-                            # Need to regenerate with LLM
+                            try:
+                                validate_sql(fixed_sql)
+                                exec_result = await session.aexecute_sql(fixed_sql)
+                                # Simple fix worked
+                                current_sql = fixed_sql
+                                if regen_task is not None:
+                                    regen_task.cancel()
+                                break
+                            except (SQLValidationError, SQLExecutionError) as fix_error:
+                                attempts.append({"sql": fixed_sql, "error": str(fix_error)})
+
+                        if regen_task is None:
+                            regen_task = regenerate()
+
+                        # Fall back to the regenerated SQL
+                        reasoning_steps.append({
+                            "icon": "🤖", 
+                            "text": "Regenerating SQL with error feedback...", 
+                            "status": "complete"
+                        })
+                        
+                        try:
+                            gen_res_retry = await regen_task
+                            current_sql = gen_res_retry["sql"]
+                            sql_cache_key = gen_res_retry.get("cache_key")
+                            reasoning_parts.append(f"[Retry {attempt+1}] {gen_res_retry.get('reasoning', '')}")
+                        except Exception as regen_error:
+                            # If regeneration fails, keep old SQL and hope for the best
                             reasoning_steps.append({
-                                "icon": "🤖", 
-                                "text": "Regenerating SQL with error feedback...", 
-                                "status": "complete"
+                                "icon": "⚠️", 
+                                "text": f"Regeneration failed: {str(regen_error)[:50]}", 
+                                "status": "error"
                             })
-                            
-                            try:
-                                retry_prompt_text = generate_retry_prompt(
-                                    user_query, 
-                                    current_sql, 
-                                    error_msg, 
-                                    fix, 
-                                    refined_schema
-                                )
-                                gen_res_retry = generate_sql_with_reasoning(
-                                    llm, 
-                                    plan, 
-                                    refined_schema, 
-                                    enriched_query,
-                                    retry_context=retry_prompt_text
-                                )
-                                current_sql = gen_res_retry["sql"]
-                                llm_reasoning += f"\n\n[Retry {attempt+1}] {gen_res_retry.get('reasoning', '')}"
-                            except Exception as regen_error:
-                                # If regeneration fails, keep old SQL and hope for the best
-                                reasoning_steps.append({
-                                    "icon": "⚠️", 
-                                    "text": f"Regeneration failed: {str(regen_error)[:50]}", 
-                                    "status": "error"
-                                })
+                            if isinstance(regen_error, CircuitOpenError):
+                                return {"answer": DEGRADED_ANSWER, "error": error_msg, "reasoning_steps": reasoning_steps, "sql": current_sql, "attempts": attempts}
+                            if not isinstance(regen_error, SQLGenerationError):
+                                # Provider trouble: give it a moment before the next attempt
+                                await asyncio.sleep(backoff_delay(attempt))
                     else:
                         # Can't retry this error
                         break
@@ -345,10 +715,23 @@ def ask_question(req: QuestionRequest):
 
         if not exec_result: exec_result = {"columns": [], "rows": [], "row_count": 0}
 
+        if events is not None:
+            # The table can be shown while the answer is still being written
+            events.put_nowait({
+                "type": "rows",
+                "sql": current_sql,
+                "columns": exec_result["columns"],
+                "rows": exec_result["rows"][:ROWS_PAGE_SIZE],
+                "row_count": exec_result["row_count"]
+            })
+
         # ... [Answer Generation] ...
         reasoning_steps.append({"icon": "💬", "text": "Constructing answer...", "status": "complete"})
         try:
-            final_answer = generate_final_answer(llm, user_query, current_sql, exec_result["columns"], exec_result["rows"], exec_result["row_count"])
+            if events is not None:
+                final_answer = await _stream_final_answer(events, user_query, current_sql, exec_result["columns"], exec_result["rows"], exec_result["row_count"])
+            else:
+                final_answer = await agenerate_final_answer(llm, user_query, current_sql, exec_result["columns"], exec_result["rows"], exec_result["row_count"])
         except:
              final_answer = interpret(exec_result, user_query)["answer"]
         
@@ -356,28 +739,86 @@ def ask_question(req: QuestionRequest):
         reasoning_steps.append({"icon": "✅", "text": "Done!", "status": "complete"})
 
         # ------------------------------------------------
-        # 🆕 Generate Follow-up Suggestions
+        # 🆕 Collect Follow-up Suggestions (started before planning)
         # ------------------------------------------------
-        suggestions = generate_related_questions(llm, user_query, refined_schema)
+        suggestions = await suggestions_task
 
-        return {
+        result = {
             "answer": final_answer,
-            "reasoning": llm_reasoning,
+            "reasoning": "\n\n".join(reasoning_parts),
             "reasoning_steps": reasoning_steps,
             "sql": current_sql,
             "columns": exec_result["columns"],
-            "rows": exec_result["rows"],
+            "rows": exec_result["rows"][:ROWS_PAGE_SIZE],
             "row_count": exec_result["row_count"],
             "truncated": exec_result.get("truncated", False),
+            "next_cursor": _next_cursor(current_sql, 0, exec_result),
             "retries": len(attempts),
             "suggestions": suggestions
         }
+        if cache_key is not None and exec_result["columns"]:
+            session.response_cache.set(cache_key, result)
+        if len(exec_result["rows"]) > ROWS_PAGE_SIZE:
+            session.result_cache.set(current_sql, exec_result)
+        return result
 
     except Exception as e:
         error_detail = f"{type(e).__name__}: {str(e)}"
         print(f"[ERROR] {traceback.format_exc()}")
         return {"answer": "Error occurred.", "error": error_detail, "reasoning_steps": [{"icon": "❌", "text": "Error", "status": "error"}]}
 
+    finally:
+        # Early returns (retry exhaustion, errors) don't need the suggestions
+        if suggestions_task and not suggestions_task.done():
+            suggestions_task.cancel()
+
+
+async def _generate_sql(session: Session, plan: dict, schema: dict, question: str, retry_context: str = "") -> dict:
+    """agenerate_sql_with_reasoning behind the LLM circuit breaker and deadline."""
+    return await LLM_BREAKER.call(
+        agenerate_sql_with_reasoning, llm, plan, schema, question,
+        retry_context=retry_context, schema_blocks=session.schema_blocks,
+        timeout=SQL_GEN_TIMEOUT
+    )
+
+
+def _next_cursor(sql: str, offset: int, exec_result: dict) -> Optional[str]:
+    """Opaque cursor for the page after `offset`, or None if nothing is left."""
+    if len(exec_result["rows"]) <= ROWS_PAGE_SIZE and not exec_result.get("truncated"):
+        return None
+    payload = orjson.dumps({"sql": sql, "offset": offset + ROWS_PAGE_SIZE})
+    return base64.urlsafe_b64encode(payload).decode() + "." + base64.urlsafe_b64encode(_cursor_mac(payload)).decode()
+
+
+def _read_cursor(cursor: str) -> dict:
+    """Payload of a cursor issued by _next_cursor; ValueError if it was not."""
+    encoded, _, mac = cursor.partition(".")
+    payload = base64.urlsafe_b64decode(encoded)
+    if not hmac.compare_digest(base64.urlsafe_b64decode(mac), _cursor_mac(payload)):
+        raise ValueError("signature mismatch")
+    return orjson.loads(payload)
+
+
+def _cursor_mac(payload: bytes) -> bytes:
+    return hmac.new(CURSOR_SECRET, payload, hashlib.sha256).digest()
+
+
+async def _stream_final_answer(events: asyncio.Queue, *answer_args) -> str:
+    """
+    Streams the final answer from a worker thread, forwarding each chunk as a
+    `token` event, and returns the full text.
+    """
+    loop = asyncio.get_running_loop()
+
+    def produce() -> str:
+        chunks = []
+        for chunk in stream_final_answer(llm, *answer_args):
+            chunks.append(chunk)
+            loop.call_soon_threadsafe(events.put_nowait, {"type": "token", "text": chunk})
+        return "".join(chunks).strip()
+
+    return await asyncio.to_thread(produce)
+
 
 # ... [Session/Health endpoints remain unchanged] ...
 @app.get("/session/{session_id}")
@@ -386,17 +827,98 @@ def get_session_info(session_id: str):
     if not session: raise HTTPException(status_code=404)
     return {"session_id": session_id, "tables": list(session.full_schema.keys()), "chat_history_length": len(session.get_chat_history()), "has_pending_clarification": session.clarification_state is not None}
 
+@app.get("/session/{session_id}/rows")
+async def get_rows(session_id: str, cursor: str, format: str = "json"):
+    """
+    Returns the next page of a previous result, as pointed to by the
+    `next_cursor` of an /ask response or of an earlier page.
+
+    With `?format=arrow` (requires pyarrow) the page is an Arrow IPC stream
+    and the following cursor is sent in the `X-Next-Cursor` header.
+    """
+    if format not in ("json", "arrow"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'arrow'")
+
+    session = await SESSIONS.aget(session_id)
+    if not session: raise HTTPException(status_code=404)
+
+    try:
+        payload = _read_cursor(cursor)
+        sql, offset = payload["sql"], int(payload["offset"])
+        validate_sql(sql)
+    except (SQLValidationError, ValueError, KeyError, TypeError) as e:
+        raise HTTPException(status_code=400, detail=f"Invalid cursor: {str(e)}")
+
+    cached = session.result_cache.get(sql)
+    if cached is not None and (offset + ROWS_PAGE_SIZE <= len(cached["rows"]) or not cached.get("truncated")):
+        # Rows already fetched by /ask; slicing them beats re-running the query
+        # and skipping `offset` rows again
+        rows = cached["rows"][offset:offset + ROWS_PAGE_SIZE]
+        page = {
+            "columns": cached["columns"],
+            "rows": rows,
+            "truncated": offset + ROWS_PAGE_SIZE < len(cached["rows"]) or cached.get("truncated", False)
+        }
+    else:
+        try:
+            page = await session.aexecute_sql(sql, max_rows=ROWS_PAGE_SIZE, offset=offset)
+        except SQLExecutionError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    next_cursor = _next_cursor(sql, offset, page)
+
+    if format == "arrow":
+        try:
+            body = await asyncio.to_thread(to_arrow_ipc, page["columns"], page["rows"])
+        except ImportError:
+            raise HTTPException(status_code=501, detail="Arrow output needs pyarrow installed on the server")
+        return Response(
+            body,
+            media_type="application/vnd.apache.arrow.stream",
+            headers={"X-Next-Cursor": next_cursor or ""}
+        )
+
+    return DataResponse({
+        "columns": page["columns"],
+        "rows": page["rows"],
+        "next_cursor": next_cursor
+    })
+
+@app.get("/session/{session_id}/warm")
+def get_warm_state(session_id: str):
+    session = SESSIONS.get(session_id)
+    if not session: raise HTTPException(status_code=404)
+    return session.warm_state
+
 @app.delete("/session/{session_id}")
 def delete_session(session_id: str):
-    session = SESSIONS.pop(session_id, None)
-    if session and os.path.exists(session.db_path): os.remove(session.db_path)
+    session = SESSIONS.pop(session_id)
+    if session: remove_db_file(session)
     return {"message": "Deleted"}
 
 @app.get("/health")
-def health(): return {"status": "ok", "active_sessions": len(SESSIONS)}
+def health(): return {"status": "ok", "active_sessions": len(SESSIONS), "llm_cache": LLM_DISK_CACHE.stats()}
 
 @app.get("/schema/{session_id}")
 def get_schema(session_id: str):
     session = SESSIONS.get(session_id)
     if not session: raise HTTPException(status_code=404)
     return {"schema": session.full_schema}
+
+
+if __name__ == "__main__":
+    import sys
+    import uvicorn
+
+    # uvloop + httptools come with uvicorn[standard]; uvloop has no Windows build.
+    # With the default in-process SessionStore, more than one worker only
+    # works behind a sticky (session-affine) load balancer; SESSION_BACKEND=redis
+    # plus a shared UPLOAD_DIR lets any worker serve any session.
+    uvicorn.run(
+        "api:app",
+        host=os.getenv("API_HOST", "127.0.0.1"),
+        port=int(os.getenv("API_PORT", "8000")),
+        loop="asyncio" if sys.platform == "win32" else "uvloop",
+        http="httptools",
+        workers=int(os.getenv("API_WORKERS", "1"))
+    )
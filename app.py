@@ -1,5 +1,10 @@
 import os
 
+from dotenv import load_dotenv
+
+# .env settings must be in the environment before the modules below read theirs
+load_dotenv()
+
 from db.validator import validate_sqlite_db
 from db.schema_extractor import extract_schema
 from db.schema_cache import SchemaCache
@@ -11,7 +16,7 @@ from nlp.intent_merger import merge_intent
 from nlp.context_builder import build_context
 from nlp.planner import create_plan
 
-from llm.client import GroqClient
+from llm.client import get_groq_client
 from llm.sql_generator import generate_sql
 
 from validation.sql_validator import validate_sql
@@ -54,7 +59,7 @@ def main():
     # 4️⃣ Create session + LLM
     # ---------------------------------
     session = Session(db_path=db_path, schema=cache.get())
-    llm = GroqClient()
+    llm = get_groq_client()
 
     logger.info("System ready. Ask questions (type 'exit' to quit).")
 
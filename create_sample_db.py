@@ -14,8 +14,16 @@ def create_sample_database():
     if os.path.exists(db_path):
         os.remove(db_path)
     
-    conn = sqlite3.connect(db_path)
+    # Explicit transaction control: the whole build (DDL + inserts) is one
+    # BEGIN/COMMIT. The file is rebuilt from scratch, so a crash mid-way costs
+    # nothing and journal/fsync work can be skipped. journal_mode=MEMORY is
+    # not persisted, so the file stays in the default rollback-journal mode
+    # that the read-only connections expect.
+    conn = sqlite3.connect(db_path, isolation_level=None)
     cursor = conn.cursor()
+    cursor.execute("PRAGMA journal_mode=MEMORY")
+    cursor.execute("PRAGMA synchronous=OFF")
+    cursor.execute("BEGIN")
     
     # Create Customers table
     cursor.execute("""
@@ -125,7 +133,7 @@ def create_sample_database():
     ]
     cursor.executemany("INSERT INTO order_items VALUES (?, ?, ?, ?, ?)", order_items)
     
-    conn.commit()
+    cursor.execute("COMMIT")
     conn.close()
     
     print(f"✅ Sample database created: {db_path}")
@@ -0,0 +1,45 @@
+"""
+Async wrapper around the SQL executor.
+
+sqlite3 calls block, so queries run on worker threads. They get their own
+small executor rather than the event loop's default one, which is shared
+with the blocking LLM calls (answer generation, intent classification)
+that hold a thread for seconds; under load, queries would otherwise queue
+behind them.
+"""
+
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+from db.executor import execute_sql, SQLExecutionError
+from db.pool import get_pool
+
+
+# Enough for every pooled connection of a few busy sessions
+DB_THREADS = int(os.getenv("DB_THREADS", "8"))
+
+DB_EXECUTOR = ThreadPoolExecutor(max_workers=DB_THREADS, thread_name_prefix="sqlite")
+
+
+async def execute_sql_async(db_path: str, sql: str, pool=None, **kwargs) -> dict:
+    """
+    Awaitable `execute_sql` on a connection from `pool` (default: the
+    shared pool for `db_path`). Takes the same keyword arguments.
+
+    Raises:
+        SQLExecutionError: If the query fails or no connection can be opened
+    """
+    if pool is None:
+        pool = get_pool(db_path)
+
+    def run() -> dict:
+        try:
+            with pool.acquire() as conn:
+                return execute_sql(db_path, sql, conn=conn, **kwargs)
+        except sqlite3.Error as e:
+            # Opening a pooled connection failed
+            raise SQLExecutionError(f"Database error: {str(e)}")
+
+    return await asyncio.get_running_loop().run_in_executor(DB_EXECUTOR, run)
@@ -4,6 +4,13 @@ Executes queries in READ-ONLY mode for safety.
 """
 
 import sqlite3
+from itertools import islice
+from typing import Optional, Sequence
+
+
+STATEMENT_CACHE_SIZE = 256
+
+RESULT_FORMATS = ("rows", "columns", "arrow")
 
 
 class SQLExecutionError(Exception):
@@ -11,7 +18,45 @@ class SQLExecutionError(Exception):
     pass
 
 
-def execute_sql(db_path: str, sql: str, max_rows: int = 1000) -> dict:
+def connect_readonly(db_path: str, check_same_thread: bool = True) -> sqlite3.Connection:
+    """
+    Opens a read-only connection tuned for repeated analytical reads:
+    ~20 MB page cache, memory-mapped I/O, in-memory temp tables (sorts,
+    GROUP BY) and `query_only` as a second guard against writes.
+
+    The page cache fills lazily, so each pooled connection can grow to
+    ~20 MB RSS on a large database. The 256 MB mmap window covers any
+    upload (MAX_DB_SIZE is 100 MB) and is shared through the OS page cache
+    rather than copied per connection.
+
+    The connection keeps up to STATEMENT_CACHE_SIZE prepared statements, so
+    re-running the same SQL text on a long-lived connection (retries,
+    repeated questions) skips parsing and planning.
+    """
+    uri = f"file:{db_path}?mode=ro"
+    conn = sqlite3.connect(
+        uri,
+        uri=True,
+        check_same_thread=check_same_thread,
+        cached_statements=STATEMENT_CACHE_SIZE
+    )
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA cache_size = -20000")
+    conn.execute("PRAGMA mmap_size = 268435456")
+    conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA query_only = 1")
+    return conn
+
+
+def execute_sql(
+    db_path: str,
+    sql: str,
+    max_rows: int = 1000,
+    conn: Optional[sqlite3.Connection] = None,
+    offset: int = 0,
+    format: str = "rows",
+    params: Sequence = ()
+) -> dict:
     """
     Executes a SQL query against the database.
     
@@ -19,62 +64,80 @@ def execute_sql(db_path: str, sql: str, max_rows: int = 1000) -> dict:
         db_path: Path to SQLite database
         sql: SQL query to execute
         max_rows: Maximum rows to return (safety limit)
+        conn: Open read-only connection to reuse; when omitted a
+            connection is opened and closed for this query
+        offset: Number of leading result rows to skip (pagination)
+        format: "rows" (default), "columns" for column-major lists under
+            "columns_data" instead of "rows", or "arrow" for a pyarrow.Table
+            under "table" (requires pyarrow)
+        params: Values for `?` placeholders in `sql`
     
     Returns:
         dict: {
             "columns": list[str],     # Column names
-            "rows": list[list],       # Row data
+            "rows": list[tuple],      # Row data
             "row_count": int,         # Total rows returned
             "truncated": bool         # True if results were truncated
         }
     
     Raises:
         SQLExecutionError: If query fails
+        ImportError: If format="arrow" and pyarrow is not installed
     """
     
+    if format not in RESULT_FORMATS:
+        raise ValueError(f"format must be one of {RESULT_FORMATS}")
+    
     if not sql or not sql.strip():
         raise SQLExecutionError("Empty SQL query provided.")
     
+    owns_conn = conn is None
+
     try:
-        # Open in read-only mode using URI
-        uri = f"file:{db_path}?mode=ro"
-        conn = sqlite3.connect(uri, uri=True)
-        conn.row_factory = sqlite3.Row
+        if owns_conn:
+            conn = connect_readonly(db_path)
         cursor = conn.cursor()
+        # Plain tuples: only positional data is returned, so skip building
+        # sqlite3.Row objects and converting them afterwards
+        cursor.row_factory = None
         
         # Execute the query
-        cursor.execute(sql)
+        cursor.execute(sql, params)
         
         # Get column names
         columns = [desc[0] for desc in cursor.description] if cursor.description else []
         
-        # Fetch rows with limit
-        all_rows = cursor.fetchmany(max_rows + 1)
-        truncated = len(all_rows) > max_rows
-        
+        # Fetch at most one row past the limit; the cursor stops stepping there
+        rows = list(islice(cursor, offset, offset + max_rows + 1))
+        truncated = len(rows) > max_rows
         if truncated:
-            rows = all_rows[:max_rows]
-        else:
-            rows = all_rows
-        
-        # Convert sqlite3.Row to list for serialization
-        rows_as_lists = [list(row) for row in rows]
+            del rows[max_rows:]
+        cursor.close()
         
-        conn.close()
-        
-        return {
+        result = {
             "columns": columns,
-            "rows": rows_as_lists,
-            "row_count": len(rows_as_lists),
+            "row_count": len(rows),
             "truncated": truncated
         }
+        if format == "rows":
+            result["rows"] = rows
+        elif format == "columns":
+            result["columns_data"] = _column_major(columns, rows)
+        else:
+            result["table"] = _arrow_table(columns, _column_major(columns, rows))
+        return result
         
+    except ImportError:
+        raise
     except sqlite3.OperationalError as e:
         raise SQLExecutionError(f"SQL execution failed: {str(e)}")
     except sqlite3.DatabaseError as e:
         raise SQLExecutionError(f"Database error: {str(e)}")
     except Exception as e:
         raise SQLExecutionError(f"Unexpected error: {str(e)}")
+    finally:
+        if owns_conn and conn is not None:
+            conn.close()
 
 
 def execute_sql_simple(db_path: str, sql: str) -> list:
@@ -82,5 +145,61 @@ def execute_sql_simple(db_path: str, sql: str) -> list:
     Simple execution that returns raw tuples.
     For backward compatibility.
     """
-    result = execute_sql(db_path, sql)
-    return [tuple(row) for row in result["rows"]]
+    # Rows already come back as tuples
+    return execute_sql(db_path, sql)["rows"]
+
+
+def execute_sql_prepared(
+    db_path: str,
+    sql_template: str,
+    params: Sequence,
+    max_rows: int = 1000,
+    conn: Optional[sqlite3.Connection] = None
+) -> dict:
+    """
+    Runs a `?`-parameterized query. The statement cache is keyed on SQL
+    text, so on a pooled connection every call with the same template
+    reuses one prepared statement whatever the values; SQL with inlined
+    literals is parsed and planned again for each distinct value.
+    """
+    return execute_sql(db_path, sql_template, max_rows=max_rows, conn=conn, params=params)
+
+
+def _column_major(columns: list, rows: list) -> list:
+    """Transposes rows into one list per column."""
+    if not rows:
+        return [[] for _ in columns]
+    return [list(values) for values in zip(*rows)]
+
+
+def _arrow_table(columns: list, columns_data: list):
+    """
+    Builds a pyarrow.Table from column-major data. SQLite columns may mix
+    types; a column pyarrow cannot type is stored as strings.
+    """
+    import pyarrow as pa
+
+    arrays = []
+    for values in columns_data:
+        try:
+            arrays.append(pa.array(values))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            arrays.append(pa.array([None if v is None else str(v) for v in values], type=pa.string()))
+
+    return pa.Table.from_arrays(arrays, names=list(columns))
+
+
+def to_arrow_ipc(columns: list, rows: list) -> bytes:
+    """
+    Packs a result column-major into an Arrow IPC stream.
+
+    Raises:
+        ImportError: If pyarrow is not installed (it is optional)
+    """
+    import pyarrow as pa
+
+    table = _arrow_table(columns, _column_major(columns, rows))
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue().to_pybytes()
@@ -0,0 +1,114 @@
+"""
+Read-only SQLite connection pool.
+
+Connections are handed out most-recently-used first, so the connection
+with the hottest page cache serves the next query. `get_pool` shares one
+pool per database file across the process, so upload validation, schema
+extraction and the session's queries all reuse the same connections.
+"""
+
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List
+
+from db.executor import connect_readonly
+
+
+class ConnectionPool:
+    """
+    Bounded pool of read-only connections to one database file.
+
+    At most `max_size` connections are open; callers beyond that wait for
+    one to be released.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 4):
+        self.db_path = db_path
+        self.max_size = max_size
+        self._idle: List[sqlite3.Connection] = []
+        self._open = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    @contextmanager
+    def acquire(self) -> Iterator[sqlite3.Connection]:
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._release(conn)
+
+    def warm(self):
+        """Opens one connection ahead of time if none is idle."""
+        with self.acquire():
+            pass
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            idle, self._idle = self._idle, []
+            self._open -= len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            conn.close()
+
+    def _checkout(self) -> sqlite3.Connection:
+        with self._cond:
+            while True:
+                if self._closed:
+                    raise sqlite3.ProgrammingError("Connection pool is closed.")
+                if self._idle:
+                    return self._idle.pop()
+                if self._open < self.max_size:
+                    self._open += 1
+                    break
+                self._cond.wait()
+
+        try:
+            return connect_readonly(self.db_path, check_same_thread=False)
+        except Exception:
+            with self._cond:
+                self._open -= 1
+                self._cond.notify()
+            raise
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._cond:
+            if not self._closed:
+                self._idle.append(conn)
+                self._cond.notify()
+                return
+            self._open -= 1
+        conn.close()
+
+
+# abspath -> shared pool
+_POOLS: Dict[str, ConnectionPool] = {}
+_POOLS_LOCK = threading.Lock()
+
+
+def get_pool(db_path: str, max_size: int = 4) -> ConnectionPool:
+    """
+    Returns the process-wide pool for `db_path`, creating it on first use.
+    The pool stays open until `close_pool` is called for the same file.
+    """
+    key = os.path.abspath(db_path)
+    with _POOLS_LOCK:
+        pool = _POOLS.get(key)
+        if pool is None or pool.closed:
+            pool = _POOLS[key] = ConnectionPool(key, max_size=max_size)
+        return pool
+
+
+def close_pool(db_path: str):
+    """Closes and forgets the shared pool for `db_path`, if there is one."""
+    with _POOLS_LOCK:
+        pool = _POOLS.pop(os.path.abspath(db_path), None)
+    if pool is not None:
+        pool.close()
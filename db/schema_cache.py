@@ -1,12 +1,26 @@
+import os
+from typing import Callable, Hashable, Optional
+
+from db.schema_extractor import extract_schema
+from utils.cache import TTLCache
+
+
 class SchemaCache:
     """
     In-memory cache for database schema metadata.
     Stores schema once per session to avoid repeated DB introspection.
+
+    `load_for` additionally memoizes extracted schemas by file fingerprint,
+    so re-introspecting an unchanged database is free.
     """
 
-    def __init__(self):
+    __slots__ = ("_schema", "_loaded", "_summary", "_by_key")
+
+    def __init__(self, maxsize: int = 32):
         self._schema = None
         self._loaded = False
+        self._summary = {}
+        self._by_key = TTLCache(maxsize=maxsize)
 
     def load(self, schema: dict):
         """
@@ -17,6 +31,14 @@ class SchemaCache:
 
         self._schema = schema
         self._loaded = True
+        # The schema never changes after load, so summarize it once
+        self._summary = {
+            "tables": len(schema),
+            "total_columns": sum(
+                len(info.get("columns", ()))
+                for info in schema.values()
+            )
+        }
 
     def get(self) -> dict:
         """
@@ -32,17 +54,44 @@ class SchemaCache:
         """
         return self._loaded
 
+    @staticmethod
+    def fingerprint(db_path: str) -> tuple:
+        """(abspath, mtime_ns, size): changes whenever the file is rewritten."""
+        st = os.stat(db_path)
+        return (os.path.abspath(db_path), st.st_mtime_ns, st.st_size)
+
+    def load_for(
+        self,
+        db_path: str,
+        key: Optional[Hashable] = None,
+        validator: Optional[Callable[[str], object]] = None
+    ) -> dict:
+        """
+        Returns the schema of `db_path`, extracting it only on a cache miss.
+
+        Args:
+            db_path: Path to the SQLite database
+            key: Cache key; defaults to `fingerprint(db_path)`. A content
+                digest lets identical uploads at different paths share an entry.
+            validator: Run on a miss before extraction (e.g. validate_sqlite_db);
+                a hit means the same file already passed it
+
+        Returns:
+            dict: Schema as produced by extract_schema
+        """
+        if key is None:
+            key = self.fingerprint(db_path)
+
+        schema = self._by_key.get(key)
+        if schema is None:
+            if validator is not None:
+                validator(db_path)
+            schema = extract_schema(db_path)
+            self._by_key.set(key, schema)
+        return schema
+
     def summary(self) -> dict:
         """
         Returns lightweight schema summary (for debugging / logging).
         """
-        if not self._loaded:
-            return {}
-
-        return {
-            "tables": len(self._schema),
-            "total_columns": sum(
-                len(info.get("columns", []))
-                for info in self._schema.values()
-            )
-        }
+        return dict(self._summary)
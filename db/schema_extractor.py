@@ -12,13 +12,20 @@ Extracts comprehensive schema information from SQLite databases including:
 import sqlite3
 from typing import Dict, List, Any
 
+from db.pool import get_pool
+from db.sql_constants import (
+    COLUMNS_SQL, FOREIGN_KEYS_SQL, HAS_STAT1_SQL, INDEXES_SQL, LIST_TABLES_SQL, STAT1_SQL
+)
 
-def extract_schema(db_path: str) -> Dict[str, Dict[str, Any]]:
+
+def extract_schema(db_path: str, exact_counts: bool = True) -> Dict[str, Dict[str, Any]]:
     """
     Extracts complete schema information from a SQLite database.
     
     Args:
         db_path: Path to the SQLite database file
+        exact_counts: Count every table's rows; False uses approximate_row_counts,
+            which avoids scanning large tables
     
     Returns:
         dict: Schema information with structure:
@@ -35,25 +42,156 @@ def extract_schema(db_path: str) -> Dict[str, Dict[str, Any]]:
                         }
                     ],
                     "indexes": ["index1", "index2"],
-                    "row_count": 1000  # Approximate
+                    "row_count": 1000
                 }
             }
     """
     
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
+    with get_pool(db_path).acquire() as conn:
+        cursor = conn.cursor()
+        if sqlite3.sqlite_version_info >= (3, 16, 0):
+            schema = _extract_schema_batched(cursor, exact_counts)
+        else:
+            schema = _extract_schema_per_table(cursor, exact_counts)
+        
+        if not exact_counts:
+            for table, row_count in approximate_row_counts(cursor, list(schema)).items():
+                schema[table]["row_count"] = row_count
+    
+    return schema
+
+
+# Default cap for approximate_row_counts: one past the "over 1 million rows"
+# warning threshold, so the cap itself still trips the warning
+ROW_COUNT_LIMIT = 1000001
+
+
+def exact_row_counts(cursor, tables: List[str]) -> Dict[str, int]:
+    """
+    Exact row counts, in one statement for all tables.
+    
+    Falls back to one COUNT(*) per table if any table is unreadable;
+    tables that still fail count as 0.
+    
+    Args:
+        cursor: Cursor on the database
+        tables: Table names to count
+    
+    Returns:
+        dict: Table name -> row count
+    """
+    if not tables:
+        return {}
+    
+    count_sql = " UNION ALL ".join(
+        'SELECT ?, COUNT(*) FROM "{}"'.format(t.replace('"', '""')) for t in tables
+    )
+    try:
+        return dict(cursor.execute(count_sql, tables).fetchall())
+    except sqlite3.Error:
+        pass
+    
+    counts: Dict[str, int] = {}
+    for table in tables:
+        quoted = table.replace('"', '""')
+        try:
+            counts[table] = cursor.execute(f'SELECT COUNT(*) FROM "{quoted}";').fetchone()[0]
+        except sqlite3.Error:
+            counts[table] = 0
+    return counts
+
+
+def approximate_row_counts(cursor, tables: List[str], limit: int = ROW_COUNT_LIMIT) -> Dict[str, int]:
+    """
+    Row counts that never scan more than `limit` rows of a table.
+    
+    Uses the sqlite_stat1 estimate for tables the database was ANALYZEd
+    with, otherwise counts at most `limit` rows, so a result equal to
+    `limit` means "at least `limit`".
     
+    Args:
+        cursor: Cursor on the database
+        tables: Table names to count
+        limit: Most rows counted per table without statistics
+    
+    Returns:
+        dict: Table name -> approximate row count
+    """
+    counts: Dict[str, int] = {}
+    
+    has_stats = cursor.execute(HAS_STAT1_SQL).fetchone()
+    if has_stats:
+        # stat is "<rows> <rows per key>..."; its first field is the table size
+        for table, stat in cursor.execute(STAT1_SQL):
+            if table in counts or not stat:
+                continue
+            try:
+                counts[table] = int(stat.split()[0])
+            except ValueError:
+                pass
+    
+    for table in tables:
+        if table in counts:
+            continue
+        quoted = table.replace('"', '""')
+        try:
+            counts[table] = cursor.execute(
+                f'SELECT COUNT(*) FROM (SELECT 1 FROM "{quoted}" LIMIT ?);', (limit,)
+            ).fetchone()[0]
+        except sqlite3.Error:
+            counts[table] = 0
+    
+    return {table: counts[table] for table in tables}
+
+
+def _extract_schema_batched(cursor, exact_counts: bool = True) -> Dict[str, Dict[str, Any]]:
+    tables = [name for (name,) in cursor.execute(LIST_TABLES_SQL).fetchall()]
+    
+    schema = {
+        table: {
+            "columns": [],
+            "column_types": {},
+            "primary_key": [],
+            "foreign_keys": [],
+            "indexes": [],
+            "row_count": 0
+        }
+        for table in tables
+    }
+    
+    for table, col_name, col_type, pk in cursor.execute(COLUMNS_SQL):
+        table_info = schema[table]
+        table_info["columns"].append(col_name)
+        table_info["column_types"][col_name] = col_type or "TEXT"
+        if pk > 0:
+            table_info["primary_key"].append(col_name)
+    
+    for table, from_col, to_table, to_col in cursor.execute(FOREIGN_KEYS_SQL):
+        schema[table]["foreign_keys"].append({
+            "from": from_col,
+            "to_table": to_table,
+            "to_column": to_col
+        })
+    
+    for table, index_name in cursor.execute(INDEXES_SQL):
+        if not index_name.startswith("sqlite_"):
+            schema[table]["indexes"].append(index_name)
+    
+    if exact_counts:
+        for table, row_count in exact_row_counts(cursor, tables).items():
+            schema[table]["row_count"] = row_count
+    
+    return schema
+
+
+def _extract_schema_per_table(cursor, exact_counts: bool = True) -> Dict[str, Dict[str, Any]]:
     schema = {}
     
     # Get all tables (excluding system tables)
-    tables = cursor.execute("""
-        SELECT name FROM sqlite_master 
-        WHERE type='table' 
-        AND name NOT LIKE 'sqlite_%'
-        ORDER BY name;
-    """).fetchall()
+    tables = cursor.execute(LIST_TABLES_SQL).fetchall()
     
     for (table,) in tables:
+        quoted = table.replace('"', '""')
         table_info = {
             "columns": [],
             "column_types": {},
@@ -64,7 +202,7 @@ def extract_schema(db_path: str) -> Dict[str, Dict[str, Any]]:
         }
         
         # Get column information
-        columns = cursor.execute(f'PRAGMA table_info("{table}");').fetchall()
+        columns = cursor.execute(f'PRAGMA table_info("{quoted}");').fetchall()
         for col in columns:
             # col: (cid, name, type, notnull, dflt_value, pk)
             col_name = col[1]
@@ -78,7 +216,7 @@ def extract_schema(db_path: str) -> Dict[str, Dict[str, Any]]:
                 table_info["primary_key"].append(col_name)
         
         # Get foreign key information
-        fks = cursor.execute(f'PRAGMA foreign_key_list("{table}");').fetchall()
+        fks = cursor.execute(f'PRAGMA foreign_key_list("{quoted}");').fetchall()
         for fk in fks:
             # fk: (id, seq, table, from, to, on_update, on_delete, match)
             table_info["foreign_keys"].append({
@@ -88,22 +226,24 @@ def extract_schema(db_path: str) -> Dict[str, Dict[str, Any]]:
             })
         
         # Get indexes
-        indexes = cursor.execute(f'PRAGMA index_list("{table}");').fetchall()
+        indexes = cursor.execute(f'PRAGMA index_list("{quoted}");').fetchall()
         for idx in indexes:
             # idx: (seq, name, unique, origin, partial)
             if not idx[1].startswith("sqlite_"):
                 table_info["indexes"].append(idx[1])
         
-        # Get approximate row count (fast method)
+        # Get row count (approximate counts are filled in by extract_schema)
+        if not exact_counts:
+            schema[table] = table_info
+            continue
         try:
-            row_count = cursor.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0]
+            row_count = cursor.execute(f'SELECT COUNT(*) FROM "{quoted}";').fetchone()[0]
             table_info["row_count"] = row_count
         except:
             table_info["row_count"] = 0
         
         schema[table] = table_info
     
-    conn.close()
     return schema
 
 
@@ -117,33 +257,27 @@ def extract_schema_summary(schema: Dict) -> str:
     Returns:
         str: Formatted schema summary
     """
-    lines = []
+    blocks = []
     
     for table, info in schema.items():
-        columns = info.get("columns", [])
         types = info.get("column_types", {})
-        pks = info.get("primary_key", [])
-        fks = info.get("foreign_keys", [])
+        pks = set(info.get("primary_key", []))
         row_count = info.get("row_count", 0)
         
-        lines.append(f"📊 **{table}** ({row_count:,} rows)")
-        
-        # Columns with types
-        col_list = []
-        for col in columns:
-            col_type = types.get(col, "")
-            pk_marker = " 🔑" if col in pks else ""
-            col_list.append(f"  • {col} ({col_type}){pk_marker}")
-        lines.extend(col_list)
-        
-        # Foreign keys
-        if fks:
-            for fk in fks:
-                lines.append(f"  → {fk['from']} → {fk['to_table']}.{fk['to_column']}")
-        
-        lines.append("")
+        # Header, columns with types, then foreign keys
+        lines = [f"📊 **{table}** ({row_count:,} rows)"]
+        lines.extend(
+            f"  • {col} ({types.get(col, '')}){' 🔑' if col in pks else ''}"
+            for col in info.get("columns", [])
+        )
+        lines.extend(
+            f"  → {fk['from']} → {fk['to_table']}.{fk['to_column']}"
+            for fk in info.get("foreign_keys", [])
+        )
+        blocks.append("\n".join(lines))
     
-    return "\n".join(lines)
+    # One blank line between tables and a trailing newline, as before
+    return "\n\n".join(blocks) + "\n" if blocks else ""
 
 
 def get_table_sample(db_path: str, table: str, limit: int = 5) -> List[Dict]:
@@ -158,18 +292,14 @@ def get_table_sample(db_path: str, table: str, limit: int = 5) -> List[Dict]:
     Returns:
         list: List of row dictionaries
     """
-    conn = sqlite3.connect(db_path)
-    conn.row_factory = sqlite3.Row
-    cursor = conn.cursor()
-    
-    try:
-        cursor.execute(f'SELECT * FROM "{table}" LIMIT ?;', (limit,))
-        rows = cursor.fetchall()
-        result = [dict(row) for row in rows]
-    except:
-        result = []
+    with get_pool(db_path).acquire() as conn:
+        try:
+            quoted = table.replace('"', '""')
+            rows = conn.execute(f'SELECT * FROM "{quoted}" LIMIT ?;', (limit,)).fetchall()
+            result = [dict(row) for row in rows]
+        except:
+            result = []
     
-    conn.close()
     return result
 
 
@@ -186,6 +316,20 @@ def infer_relationships(schema: Dict) -> List[Dict]:
     """
     relationships = []
     tables = list(schema.keys())
+    order = {table: i for i, table in enumerate(tables)}
+    
+    # Lowercased names, plus the `<prefix>_id` prefixes each table answers
+    # to (exact, singular, or with the plural "s" added)
+    by_name: Dict[str, List[str]] = {}
+    by_id_prefix: Dict[str, List[str]] = {}
+    for other_table in tables:
+        name = other_table.lower()
+        by_name.setdefault(name, []).append(other_table)
+        prefixes = {name, name.rstrip("s")}
+        if name.endswith("s"):
+            prefixes.add(name[:-1])
+        for prefix in prefixes:
+            by_id_prefix.setdefault(prefix, []).append(other_table)
     
     for table in tables:
         columns = schema[table].get("columns", [])
@@ -196,30 +340,29 @@ def infer_relationships(schema: Dict) -> List[Dict]:
             # Check for common FK patterns
             # Pattern 1: column_name_id
             if col_lower.endswith("_id"):
-                prefix = col_lower[:-3]
-                
-                # Look for matching table
-                for other_table in tables:
-                    if other_table.lower() == prefix or \
-                       other_table.lower() == prefix + "s" or \
-                       other_table.lower().rstrip("s") == prefix:
-                        relationships.append({
-                            "from_table": table,
-                            "from_column": col,
-                            "to_table": other_table,
-                            "to_column": "id",
-                            "inferred": True
-                        })
-            
-            # Pattern 2: table_name_column
-            for other_table in tables:
-                if col_lower.startswith(other_table.lower() + "_"):
+                for other_table in by_id_prefix.get(col_lower[:-3], ()):
                     relationships.append({
                         "from_table": table,
                         "from_column": col,
                         "to_table": other_table,
-                        "to_column": col_lower.replace(other_table.lower() + "_", ""),
+                        "to_column": "id",
                         "inferred": True
                     })
+            
+            # Pattern 2: table_name_column (every "_" marks a candidate table name)
+            matches = []
+            pos = col_lower.find("_")
+            while pos != -1:
+                matches.extend(by_name.get(col_lower[:pos], ()))
+                pos = col_lower.find("_", pos + 1)
+            
+            for other_table in sorted(matches, key=order.__getitem__):
+                relationships.append({
+                    "from_table": table,
+                    "from_column": col,
+                    "to_table": other_table,
+                    "to_column": col_lower.replace(other_table.lower() + "_", ""),
+                    "inferred": True
+                })
     
     return relationships
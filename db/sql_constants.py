@@ -0,0 +1,34 @@
+"""
+Introspection queries shared by the validator and the schema extractor.
+
+Connections cache prepared statements by exact SQL text (see
+STATEMENT_CACHE_SIZE in db.executor), and the same pooled connection
+serves validation, extraction and info calls for a file, so these are
+kept as single constants rather than near-identical copies.
+"""
+
+# User tables in a stable order
+LIST_TABLES_SQL = (
+    "SELECT name FROM sqlite_master "
+    "WHERE type='table' AND name NOT LIKE 'sqlite_%' ORDER BY name;"
+)
+
+# Triggers, views and user tables, as (type, name)
+LIST_OBJECTS_SQL = (
+    "SELECT type, name FROM sqlite_master "
+    "WHERE type IN ('trigger', 'view') "
+    "OR (type='table' AND name NOT LIKE 'sqlite_%') ORDER BY name;"
+)
+
+HAS_STAT1_SQL = "SELECT 1 FROM sqlite_master WHERE type='table' AND name='sqlite_stat1';"
+
+STAT1_SQL = "SELECT tbl, stat FROM sqlite_stat1;"
+
+SQLITE_VERSION_SQL = "SELECT sqlite_version();"
+
+# Tables joined with a PRAGMA table-valued function (SQLite >= 3.16): one
+# query per kind of metadata instead of one per table
+_USER_TABLES = "FROM sqlite_master m, {} p WHERE m.type = 'table' AND m.name NOT LIKE 'sqlite_%'"
+COLUMNS_SQL = "SELECT m.name, p.name, p.type, p.pk " + _USER_TABLES.format("pragma_table_info(m.name)")
+FOREIGN_KEYS_SQL = 'SELECT m.name, p."from", p."table", p."to" ' + _USER_TABLES.format("pragma_foreign_key_list(m.name)")
+INDEXES_SQL = "SELECT m.name, p.name " + _USER_TABLES.format("pragma_index_list(m.name)")
@@ -9,8 +9,13 @@ Validates SQLite database files for:
 
 import os
 import sqlite3
+import stat
 from typing import List, Tuple
 
+from db.pool import get_pool
+from db.schema_extractor import approximate_row_counts, exact_row_counts
+from db.sql_constants import LIST_OBJECTS_SQL, LIST_TABLES_SQL, SQLITE_VERSION_SQL
+
 
 class DatabaseValidationError(Exception):
     """Raised when database validation fails."""
@@ -26,6 +31,9 @@ MIN_DB_SIZE = 100
 # SQLite magic bytes
 SQLITE_MAGIC = b"SQLite format 3\x00"
 
+# Database header size; it also holds the page size and format versions
+SQLITE_HEADER_SIZE = 100
+
 
 def validate_sqlite_db(db_path: str) -> bool:
     """
@@ -41,12 +49,19 @@ def validate_sqlite_db(db_path: str) -> bool:
         DatabaseValidationError: If validation fails
     """
     
-    # 1. Check file exists
-    if not os.path.exists(db_path):
+    # 1. Check file exists (one stat serves the existence, type and size checks)
+    try:
+        st = os.stat(db_path)
+    except FileNotFoundError:
         raise DatabaseValidationError("Database file not found.")
+    except OSError as e:
+        raise DatabaseValidationError(f"Failed to read database file: {str(e)}")
+    
+    if not stat.S_ISREG(st.st_mode):
+        raise DatabaseValidationError("Database path is not a regular file.")
     
     # 2. Check file size
-    file_size = os.path.getsize(db_path)
+    file_size = st.st_size
     
     if file_size < MIN_DB_SIZE:
         raise DatabaseValidationError("File is too small to be a valid SQLite database.")
@@ -56,56 +71,67 @@ def validate_sqlite_db(db_path: str) -> bool:
             f"Database file exceeds maximum size limit ({MAX_DB_SIZE // (1024*1024)} MB)."
         )
     
-    # 3. Check SQLite magic bytes
+    # 3. Check the SQLite header (unbuffered: only the first 100 bytes are needed)
     try:
-        with open(db_path, "rb") as f:
-            header = f.read(16)
-            if not header.startswith(SQLITE_MAGIC):
-                raise DatabaseValidationError(
-                    "File is not a valid SQLite database (invalid header)."
-                )
-    except IOError as e:
+        fd = os.open(db_path, os.O_RDONLY)
+        try:
+            header = os.read(fd, SQLITE_HEADER_SIZE)
+        finally:
+            os.close(fd)
+    except OSError as e:
         raise DatabaseValidationError(f"Failed to read database file: {str(e)}")
     
-    # 4. Validate database integrity
+    if not header.startswith(SQLITE_MAGIC):
+        raise DatabaseValidationError(
+            "File is not a valid SQLite database (invalid header)."
+        )
+    
+    # Reject damaged headers here rather than in the integrity check below
+    if len(header) < SQLITE_HEADER_SIZE or not _header_is_sane(header):
+        raise DatabaseValidationError(
+            "File is not a valid SQLite database (corrupted header)."
+        )
+    
+    # 4. Validate database integrity (through the shared read-only pool, so
+    # the session opened next starts with a warm connection)
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Run integrity check
-        result = cursor.execute("PRAGMA integrity_check;").fetchone()
-        if result[0] != "ok":
-            raise DatabaseValidationError(
-                f"Database integrity check failed: {result[0]}"
-            )
-        
-        # Check that there are tables
-        tables = cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
-        ).fetchall()
-        
-        if not tables:
-            raise DatabaseValidationError(
-                "Database contains no tables."
-            )
-        
-        # Validate each table is readable
-        for (table,) in tables:
-            try:
-                cursor.execute(f'SELECT 1 FROM "{table}" LIMIT 1;')
-            except sqlite3.Error as e:
+        with get_pool(db_path).acquire() as conn:
+            cursor = conn.cursor()
+            
+            # Run integrity check. quick_check reads every table and index
+            # page but skips the index-vs-table cross check, and (1) stops at
+            # the first problem
+            result = cursor.execute("PRAGMA quick_check(1);").fetchone()
+            if result[0] != "ok":
                 raise DatabaseValidationError(
-                    f"Table '{table}' is corrupted or unreadable: {str(e)}"
+                    f"Database integrity check failed: {result[0]}"
                 )
-        
-        conn.close()
-        
+            
+            # Check that there are tables (the first name is enough; no
+            # per-table probe is needed after quick_check)
+            first_table = cursor.execute(LIST_TABLES_SQL).fetchone()
+            
+            if first_table is None:
+                raise DatabaseValidationError(
+                    "Database contains no tables."
+                )
+    
     except sqlite3.Error as e:
         raise DatabaseValidationError(f"Database error: {str(e)}")
     
     return True
 
 
+def _header_is_sane(header: bytes) -> bool:
+    """Page size is a power of two in 512..65536; format versions are 1 or 2."""
+    page_size = int.from_bytes(header[16:18], "big")
+    if page_size == 1:
+        page_size = 65536
+    if page_size < 512 or page_size & (page_size - 1):
+        return False
+    return header[18] in (1, 2) and header[19] in (1, 2)
+
+
 def get_database_info(db_path: str) -> dict:
     """
     Gets detailed information about a database.
@@ -119,50 +145,44 @@ def get_database_info(db_path: str) -> dict:
     
     validate_sqlite_db(db_path)
     
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
+    with get_pool(db_path).acquire() as conn:
+        return _database_info(db_path, conn.cursor())
+
+
+def _database_info(db_path: str, cursor) -> dict:
+    file_size = os.stat(db_path).st_size
     info = {
-        "file_size_bytes": os.path.getsize(db_path),
-        "file_size_mb": round(os.path.getsize(db_path) / (1024 * 1024), 2),
+        "file_size_bytes": file_size,
+        "file_size_mb": round(file_size / (1024 * 1024), 2),
         "tables": [],
         "total_rows": 0
     }
     
     # Get tables
-    tables = cursor.execute(
-        "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
-    ).fetchall()
+    tables = [name for (name,) in cursor.execute(LIST_TABLES_SQL).fetchall()]
     
-    for (table,) in tables:
-        try:
-            row_count = cursor.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0]
-            info["tables"].append({
-                "name": table,
-                "row_count": row_count
-            })
-            info["total_rows"] += row_count
-        except:
-            info["tables"].append({
-                "name": table,
-                "row_count": 0
-            })
+    for table, row_count in exact_row_counts(cursor, tables).items():
+        info["tables"].append({
+            "name": table,
+            "row_count": row_count
+        })
+        info["total_rows"] += row_count
     
     # Get SQLite version
-    version = cursor.execute("SELECT sqlite_version();").fetchone()[0]
+    version = cursor.execute(SQLITE_VERSION_SQL).fetchone()[0]
     info["sqlite_version"] = version
     
-    conn.close()
-    
     return info
 
 
-def check_dangerous_content(db_path: str) -> List[str]:
+def check_dangerous_content(db_path: str, check_row_counts: bool = True) -> List[str]:
     """
     Checks for potentially dangerous content in the database.
     
     Args:
         db_path: Path to the database
+        check_row_counts: Also warn about tables over 1 million rows
+            (counted up to ROW_COUNT_LIMIT, see approximate_row_counts)
     
     Returns:
         list: List of warnings (empty if safe)
@@ -171,48 +191,40 @@ def check_dangerous_content(db_path: str) -> List[str]:
     warnings = []
     
     try:
-        conn = sqlite3.connect(db_path)
-        cursor = conn.cursor()
-        
-        # Check for triggers (could contain malicious code)
-        triggers = cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='trigger';"
-        ).fetchall()
-        
-        if triggers:
-            warnings.append(
-                f"Database contains {len(triggers)} trigger(s). "
-                "These will not be executed in read-only mode."
-            )
-        
-        # Check for views with potentially complex queries
-        views = cursor.execute(
-            "SELECT name, sql FROM sqlite_master WHERE type='view';"
-        ).fetchall()
-        
-        if len(views) > 10:
-            warnings.append(
-                f"Database contains {len(views)} views. "
-                "Complex views may slow down queries."
-            )
-        
-        # Check for very large tables
-        tables = cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name NOT LIKE 'sqlite_%';"
-        ).fetchall()
-        
-        for (table,) in tables:
-            try:
-                count = cursor.execute(f'SELECT COUNT(*) FROM "{table}";').fetchone()[0]
-                if count > 1000000:
-                    warnings.append(
-                        f"Table '{table}' contains over 1 million rows. "
-                        "Queries may be slow."
-                    )
-            except:
-                pass
-        
-        conn.close()
+        with get_pool(db_path).acquire() as conn:
+            cursor = conn.cursor()
+            
+            # Triggers, views and tables in one pass over sqlite_master
+            objects = {"trigger": [], "view": [], "table": []}
+            for obj_type, name in cursor.execute(LIST_OBJECTS_SQL):
+                objects[obj_type].append(name)
+            
+            # Check for triggers (could contain malicious code)
+            triggers = objects["trigger"]
+            
+            if triggers:
+                warnings.append(
+                    f"Database contains {len(triggers)} trigger(s). "
+                    "These will not be executed in read-only mode."
+                )
+            
+            # Check for views with potentially complex queries
+            views = objects["view"]
+            
+            if len(views) > 10:
+                warnings.append(
+                    f"Database contains {len(views)} views. "
+                    "Complex views may slow down queries."
+                )
+            
+            # Check for very large tables (an estimate is enough for a warning)
+            if check_row_counts:
+                for table, count in approximate_row_counts(cursor, objects["table"]).items():
+                    if count > 1000000:
+                        warnings.append(
+                            f"Table '{table}' contains over 1 million rows. "
+                            "Queries may be slow."
+                        )
         
     except sqlite3.Error:
         pass
@@ -3,37 +3,50 @@ End-to-End System Test
 Tests the complete flow: Upload DB -> Ask Questions -> Get Results
 """
 
-import requests
-import json
+import asyncio
+import httpx
+import orjson
+import re
 import time
 import os
 import sys
 from pathlib import Path
 
-# Fix encoding for Windows
+# Fix encoding for Windows (in place, keeping the native text writer)
 if sys.platform == 'win32':
-    import codecs
-    sys.stdout = codecs.getwriter('utf-8')(sys.stdout.buffer, 'strict')
-    sys.stderr = codecs.getwriter('utf-8')(sys.stderr.buffer, 'strict')
+    sys.stdout.reconfigure(encoding='utf-8', errors='strict')
+    sys.stderr.reconfigure(encoding='utf-8', errors='strict')
 
 API_URL = "http://localhost:8000"
 
+# SQL features reported per answer, found in one case-insensitive pass
+SQL_FEATURES_RE = re.compile(r"\b(WITH|NOT\s+EXISTS|JOIN|GROUP\s+BY)\b", re.IGNORECASE)
+
+# One pooled client for every call; keep-alive connections are reused and
+# failed connection attempts are retried
+HTTP_LIMITS = httpx.Limits(max_connections=20, max_keepalive_connections=10)
+CONNECT_RETRIES = 2
+
+# --stream: ask the tests one by one over /ask/stream and show each
+# reasoning step as soon as the server emits it
+STREAM_ANSWERS = "--stream" in sys.argv
+
+# Section rulers
+_EQ80 = "=" * 80
+_DASH80 = "─" * 80
+
 def print_header(title):
     """Print a formatted header"""
-    print("\n" + "=" * 80)
-    print(f"  {title}")
-    print("=" * 80)
+    print(f"\n{_EQ80}\n  {title}\n{_EQ80}")
 
 def print_section(title):
     """Print a section header"""
-    print(f"\n{'─' * 80}")
-    print(f"  {title}")
-    print(f"{'─' * 80}")
+    print(f"\n{_DASH80}\n  {title}\n{_DASH80}")
 
-def check_api_health():
+async def check_api_health(client):
     """Check if API is running"""
     try:
-        response = requests.get(f"{API_URL}/health", timeout=5)
+        response = await client.get("/health", timeout=5)
         if response.status_code == 200:
             print("✅ API is running and healthy")
             return True
@@ -45,7 +58,7 @@ def check_api_health():
         print("   Make sure to run: uvicorn api:app --reload --port 8000")
         return False
 
-def upload_database(db_path):
+async def upload_database(client, db_path):
     """Upload a database and return session_id"""
     print_section("📤 STEP 1: Upload Database")
     
@@ -55,14 +68,16 @@ def upload_database(db_path):
     
     print(f"📁 Uploading: {db_path}")
     
+    # The open file is streamed in chunks as the multipart body is sent,
+    # rather than read into memory first
     with open(db_path, 'rb') as f:
         files = {'file': (os.path.basename(db_path), f, 'application/x-sqlite3')}
         
         try:
-            response = requests.post(f"{API_URL}/upload-db", files=files, timeout=30)
+            response = await client.post("/upload-db", files=files, timeout=300)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 session_id = data.get('session_id')
                 schema = data.get('schema', {})
                 
@@ -88,39 +103,109 @@ def upload_database(db_path):
             print(f"❌ Error uploading: {e}")
             return None
 
-def ask_question(session_id, question, test_name=""):
-    """Ask a question and display results"""
-    print_section(f"💬 {test_name}")
-    
-    print(f"❓ Question: {question}")
+async def ask_question(client, session_id, question, on_step=None):
+    """
+    Ask a question over the /ask/stream event stream; returns
+    (response, elapsed seconds) or (exception, None).
     
+    Each reasoning step is passed to on_step as the server emits it, so it
+    can be shown while the rest of the pipeline is still running.
+    """
     payload = {
         "session_id": session_id,
         "question": question
     }
     
     try:
-        print("⏳ Processing...")
         start_time = time.time()
+        result = None
+        async with client.stream("POST", "/ask/stream", json=payload, timeout=60) as response:
+            if response.status_code != 200:
+                await response.aread()
+                return response, time.time() - start_time
+            
+            step_number = 0
+            async for line in response.aiter_lines():
+                if not line.startswith("data: "):
+                    continue
+                event = orjson.loads(line[6:])
+                if event["type"] == "step":
+                    step_number += 1
+                    if on_step:
+                        on_step(step_number, event)
+                elif event["type"] == "result":
+                    result = event
         
-        response = requests.post(f"{API_URL}/ask", json=payload, timeout=60)
-        
+        if result is None:
+            raise RuntimeError("Stream ended without a result")
+        del result["type"]
+        # Repackaged so show_answer treats it like an /ask response
+        return httpx.Response(200, content=orjson.dumps(result)), time.time() - start_time
+    except Exception as e:
+        return e, None
+
+async def ask_many(client, session_id, questions):
+    """
+    Ask several questions in one /ask-batch call; returns one
+    (response, elapsed seconds) outcome per question, like ask_question
+    """
+    payload = {
+        "session_id": session_id,
+        "questions": questions
+    }
+    
+    try:
+        start_time = time.time()
+        response = await client.post("/ask-batch", json=payload, timeout=60 * len(questions))
         elapsed = time.time() - start_time
+    except Exception as e:
+        return [(e, None)] * len(questions)
+    
+    if response.status_code != 200:
+        return [(response, elapsed)] * len(questions)
+    
+    # Repackaged so show_answer treats each entry like an /ask response
+    results = orjson.loads(response.content)["results"]
+    return [(httpx.Response(200, content=orjson.dumps(data)), elapsed) for data in results]
+
+def print_step(number, step):
+    """Print one reasoning step"""
+    icon = step.get("icon", "")
+    text = step.get("text", "")
+    status = step.get("status", "")
+    print(f"   {number}. {icon} {text} [{status}]")
+
+def print_question(question, test_name=""):
+    """Print the section header for one question"""
+    print_section(f"💬 {test_name}")
+    
+    print(f"❓ Question: {question}")
+
+def show_answer(question, outcome, test_name="", streamed=False):
+    """
+    Display the results of one question. With streamed=True the header and
+    reasoning steps were already printed while the answer was streaming.
+    """
+    if not streamed:
+        print_question(question, test_name)
+    
+    response, elapsed = outcome
+    
+    try:
+        if isinstance(response, Exception):
+            raise response
         
         if response.status_code == 200:
-            data = response.json()
+            data = orjson.loads(response.content)
             
             print(f"✅ Response received in {elapsed:.2f}s\n")
             
             # Display reasoning steps
-            reasoning_steps = data.get("reasoning_steps", [])
+            reasoning_steps = [] if streamed else data.get("reasoning_steps", [])
             if reasoning_steps:
                 print("🧠 Reasoning Steps:")
                 for i, step in enumerate(reasoning_steps[:8], 1):  # Show first 8
-                    icon = step.get("icon", "")
-                    text = step.get("text", "")
-                    status = step.get("status", "")
-                    print(f"   {i}. {icon} {text} [{status}]")
+                    print_step(i, step)
                 if len(reasoning_steps) > 8:
                     print(f"   ... and {len(reasoning_steps) - 8} more steps")
             
@@ -136,30 +221,28 @@ def ask_question(session_id, question, test_name=""):
                     print(f"   ... ({len(sql_lines) - 15} more lines)")
                 
                 # Check for key patterns
-                sql_upper = sql.upper()
+                features = {" ".join(m.group(1).upper().split()) for m in SQL_FEATURES_RE.finditer(sql)}
                 print(f"\n🔍 SQL Analysis:")
-                print(f"   • Uses CTE (WITH): {'WITH' in sql_upper}")
-                print(f"   • Uses NOT EXISTS: {'NOT EXISTS' in sql_upper}")
-                print(f"   • Uses JOIN: {'JOIN' in sql_upper}")
-                print(f"   • Uses GROUP BY: {'GROUP BY' in sql_upper}")
+                print(f"   • Uses CTE (WITH): {'WITH' in features}")
+                print(f"   • Uses NOT EXISTS: {'NOT EXISTS' in features}")
+                print(f"   • Uses JOIN: {'JOIN' in features}")
+                print(f"   • Uses GROUP BY: {'GROUP BY' in features}")
             
-            # Display results
-            results = data.get("results", [])
-            if results:
-                print(f"\n📊 Query Results ({len(results)} rows):")
-                if len(results) > 0:
-                    # Show column headers
-                    headers = list(results[0].keys())
-                    print(f"\n   {' | '.join(headers)}")
-                    print(f"   {'-' * (len(' | '.join(headers)))} ")
-                    
-                    # Show first 5 rows
-                    for row in results[:5]:
-                        values = [str(v) for v in row.values()]
-                        print(f"   {' | '.join(values)}")
-                    
-                    if len(results) > 5:
-                        print(f"   ... and {len(results) - 5} more rows")
+            # Display results (the API returns column names plus row arrays)
+            columns = data.get("columns", [])
+            rows = data.get("rows", [])
+            row_count = data.get("row_count", len(rows))
+            if rows:
+                print(f"\n📊 Query Results ({row_count} rows):")
+                header_line = " | ".join(columns)
+                print(f"\n   {header_line}\n   {'-' * len(header_line)} ")
+                
+                # Show first 5 rows
+                for row in rows[:5]:
+                    print("   " + " | ".join(map(str, row)))
+                
+                if row_count > 5:
+                    print(f"   ... and {row_count - 5} more rows")
             else:
                 print(f"\n📊 Query Results: No rows returned")
             
@@ -169,7 +252,7 @@ def ask_question(session_id, question, test_name=""):
                 print(f"\n💬 Natural Language Answer:")
                 print(f"   {answer[:300]}...")
             
-            print(f"\n{'─' * 80}")
+            print(f"\n{_DASH80}")
             return True
             
         else:
@@ -177,7 +260,7 @@ def ask_question(session_id, question, test_name=""):
             print(response.text)
             return False
             
-    except requests.exceptions.Timeout:
+    except httpx.TimeoutException:
         print("❌ Request timed out (>60s)")
         return False
     except Exception as e:
@@ -186,7 +269,7 @@ def ask_question(session_id, question, test_name=""):
         traceback.print_exc()
         return False
 
-def run_test_suite(session_id):
+async def run_test_suite(client, session_id):
     """Run a suite of test queries"""
     print_header("🧪 STEP 2: Run Test Queries")
     
@@ -214,13 +297,29 @@ def run_test_suite(session_id):
     ]
     
     results = []
-    for test in tests:
-        success = ask_question(session_id, test["question"], test["name"])
-        results.append({
-            "test": test["name"],
-            "success": success
-        })
-        time.sleep(1)  # Small delay between tests
+    if STREAM_ANSWERS:
+        # One question at a time, printing reasoning steps as they arrive
+        for test in tests:
+            print_question(test["question"], test["name"])
+            print("🧠 Reasoning Steps:")
+            outcome = await ask_question(client, session_id, test["question"], on_step=print_step)
+            success = show_answer(test["question"], outcome, test["name"], streamed=True)
+            results.append({
+                "test": test["name"],
+                "success": success
+            })
+    else:
+        # One round trip for the whole suite; the server answers the questions
+        # in order on the session, as separate /ask calls would
+        print(f"⏳ Running {len(tests)} tests in one batch...")
+        outcomes = await ask_many(client, session_id, [test["question"] for test in tests])
+        
+        for test, outcome in zip(tests, outcomes):
+            success = show_answer(test["question"], outcome, test["name"])
+            results.append({
+                "test": test["name"],
+                "success": success
+            })
     
     # Summary
     print_header("📊 TEST SUMMARY")
@@ -238,13 +337,22 @@ def run_test_suite(session_id):
     else:
         print(f"\n⚠️  {total - passed} test(s) failed")
 
-def main():
+async def main():
     """Main test flow"""
     print_header("🚀 END-TO-END SYSTEM TEST")
     
+    async with httpx.AsyncClient(
+        base_url=API_URL,
+        timeout=60,
+        transport=httpx.AsyncHTTPTransport(limits=HTTP_LIMITS, retries=CONNECT_RETRIES)
+    ) as client:
+        await run(client)
+
+async def run(client):
+    """Health check, upload, then the test suite"""
     # Check API
     print_section("🔍 Checking API Status")
-    if not check_api_health():
+    if not await check_api_health(client):
         print("\n❌ Cannot proceed - API is not running")
         return
     
@@ -258,18 +366,18 @@ def main():
         print()
     
     # Upload database
-    session_id = upload_database(db_path)
+    session_id = await upload_database(client, db_path)
     
     if not session_id:
         print("\n❌ Cannot proceed - database upload failed")
         return
     
     # Run tests
-    run_test_suite(session_id)
+    await run_test_suite(client, session_id)
     
     print_header("✅ TEST COMPLETE")
     print("\n💡 You can now use this session_id in the Streamlit UI or test_query.py")
     print(f"   Session ID: {session_id}\n")
 
 if __name__ == "__main__":
-    main()
+    asyncio.run(main())
@@ -0,0 +1,114 @@
+"""
+LLM Response Cache
+
+Exact-match cache for LLM sub-steps (intent classification, suggestions).
+Keys are a blake3 digest (blake2b when the blake3 package is not installed)
+of (namespace, model, temperature, prompt), and
+prompts already embed the schema they were built from, so a cached answer
+is only reused for the same schema.
+
+Failed calls raise before anything is stored, so fallbacks are never cached.
+"""
+
+import hashlib
+from typing import Dict, Optional
+
+from utils.cache import TTLCache
+
+try:
+    from blake3 import blake3 as _hasher
+except ImportError:
+    def _hasher():
+        return hashlib.blake2b(digest_size=16)
+
+
+# namespace -> cache (created on first use)
+_STORES: Dict[str, TTLCache] = {}
+
+_MISSING = object()
+
+
+def _store(namespace: str, ttl: Optional[float], maxsize: int) -> TTLCache:
+    store = _STORES.get(namespace)
+    if store is None:
+        store = _STORES.setdefault(namespace, TTLCache(maxsize=maxsize, ttl=ttl))
+    return store
+
+
+def prompt_key(namespace: str, model: str, prompt: str, temperature: float) -> bytes:
+    """Builds the cache key for one prompt."""
+    h = _hasher()
+    h.update(f"{namespace}|{model}|{temperature}|".encode())
+    h.update(prompt.encode())
+    return h.digest()
+
+
+def cached_generate(
+    llm_client,
+    prompt: str,
+    namespace: str,
+    temperature: float = 0.1,
+    ttl: Optional[float] = 3600,
+    maxsize: int = 1024,
+    **kwargs
+) -> str:
+    """
+    Calls `llm_client.generate` through the cache for `namespace`.
+
+    Args:
+        llm_client: LLM client instance
+        prompt: Full prompt text
+        namespace: Cache bucket, usually the calling helper's name
+        temperature: Sampling temperature (part of the key)
+        ttl: Seconds to keep the answer, or None to keep it until evicted
+        maxsize: Max entries in this namespace
+        **kwargs: Extra arguments forwarded to `generate`
+
+    Returns:
+        str: The (possibly cached) LLM response
+    """
+    store = _store(namespace, ttl, maxsize)
+    key = prompt_key(namespace, getattr(llm_client, "model", ""), prompt, temperature)
+
+    hit = store.get(key, _MISSING)
+    if hit is not _MISSING:
+        return hit
+
+    # This store is the only cache layer for the call; the client's own
+    # memory/disk tiers would just hold a second copy
+    response = llm_client.generate(prompt, temperature=temperature, cache=False, **kwargs)
+    store.set(key, response)
+    return response
+
+
+async def acached_generate(
+    llm_client,
+    prompt: str,
+    namespace: str,
+    temperature: float = 0.1,
+    ttl: Optional[float] = 3600,
+    maxsize: int = 1024,
+    **kwargs
+) -> str:
+    """
+    Async version of cached_generate, using `llm_client.agenerate`.
+    """
+    store = _store(namespace, ttl, maxsize)
+    key = prompt_key(namespace, getattr(llm_client, "model", ""), prompt, temperature)
+
+    hit = store.get(key, _MISSING)
+    if hit is not _MISSING:
+        return hit
+
+    response = await llm_client.agenerate(prompt, temperature=temperature, cache=False, **kwargs)
+    store.set(key, response)
+    return response
+
+
+def clear_cache(namespace: Optional[str] = None):
+    """Clears one namespace, or every namespace when none is given."""
+    if namespace is None:
+        for store in _STORES.values():
+            store.clear()
+    elif namespace in _STORES:
+        _STORES[namespace].clear()
@@ -1,23 +1,207 @@
+import asyncio
 import os
-from groq import Groq
+import threading
+from functools import lru_cache
+
+import httpx
+from groq import Groq, AsyncGroq
 from dotenv import load_dotenv
 
-load_dotenv()
+from llm.cache import prompt_key
+from llm.disk_cache import LLM_DISK_CACHE
+from utils.cache import TTLCache
+
+
+# One pooled HTTP/2 connection set is shared by every LLM call in the process,
+# so TLS handshakes are paid once instead of on every request. Idle
+# connections are kept for a minute (httpx default: 5s) because calls from
+# one user are often several seconds apart.
+LLM_TIMEOUT = httpx.Timeout(60.0, connect=5.0)
+LLM_LIMITS = httpx.Limits(max_connections=1000, max_keepalive_connections=200, keepalive_expiry=60.0)
+
+# Retries on 429 / 5xx use the SDK's exponential backoff
+LLM_MAX_RETRIES = 3
+
+# Completions for identical (model, temperature, prompt) calls are reused
+# for an hour, from memory and then from the on-disk LLM cache so a restart
+# does not start cold; hotter sampling is meant to vary, so it is never cached.
+# Callers with their own cache (llm.cache, SQL generation) pass cache=False.
+RESPONSE_CACHE_ENABLED = os.getenv("GROQ_CACHE_ENABLED", "1") != "0"
+RESPONSE_CACHE_MAX_TEMPERATURE = 0.3
+RESPONSE_CACHE_TTL = 3600  # seconds
+
+# Built once and shared by every request
+SYSTEM_MESSAGE = {"role": "system", "content": "You are an expert SQL generator."}
+
+
+@lru_cache(maxsize=1)
+def _load_env():
+    """Reads .env once, on first use of the LLM rather than at import."""
+    load_dotenv()
+
 
 class GroqClient:
+    """
+    Groq chat client. The SDK clients and their connection pools are built
+    on first use, so constructing (or importing) this is free.
+    """
+
     def __init__(self):
-        self.client = Groq(
-            api_key=os.getenv("GROQ_API_KEY")
+        self._client = None
+        self._aclient = None
+        self._http = None
+        self._ahttp = None
+        self._model = None
+        self._init_lock = threading.Lock()
+        self._responses = TTLCache(maxsize=512, ttl=RESPONSE_CACHE_TTL)
+
+    @property
+    def model(self):
+        if self._model is None:
+            _load_env()
+            self._model = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+        return self._model
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._init_lock:
+                if self._client is None:
+                    _load_env()
+                    self._http = httpx.Client(
+                        timeout=LLM_TIMEOUT,
+                        limits=LLM_LIMITS,
+                        http2=True
+                    )
+                    self._client = Groq(
+                        api_key=os.getenv("GROQ_API_KEY"),
+                        http_client=self._http,
+                        max_retries=LLM_MAX_RETRIES
+                    )
+        return self._client
+
+    @property
+    def aclient(self):
+        # Async twin on its own pool, for callers running on the event loop
+        if self._aclient is None:
+            with self._init_lock:
+                if self._aclient is None:
+                    _load_env()
+                    self._ahttp = httpx.AsyncClient(
+                        timeout=LLM_TIMEOUT,
+                        limits=LLM_LIMITS,
+                        http2=True
+                    )
+                    self._aclient = AsyncGroq(
+                        api_key=os.getenv("GROQ_API_KEY"),
+                        http_client=self._ahttp,
+                        max_retries=LLM_MAX_RETRIES
+                    )
+        return self._aclient
+
+    def _cache_key(self, prompt, temperature, max_tokens, cache):
+        if not (cache and RESPONSE_CACHE_ENABLED and temperature <= RESPONSE_CACHE_MAX_TEMPERATURE):
+            return None
+        return prompt_key(f"client|{max_tokens}", self.model, prompt, temperature)
+
+    def _from_disk(self, key):
+        """Second-tier lookup after a memory miss; a hit is kept in memory."""
+        hit = LLM_DISK_CACHE.get(key)
+        if hit is not None:
+            self._responses.set(key, hit)
+        return hit
+
+    def _store(self, key, text):
+        self._responses.set(key, text)
+        LLM_DISK_CACHE.set(key, text, ttl=RESPONSE_CACHE_TTL)
+
+    def generate(self, prompt, temperature=0.1, max_tokens=None, cache=True):
+        """
+        Returns the completion for `prompt`. Pass cache=False when the caller
+        keeps (and may invalidate) its own cache of the response.
+        """
+        key = self._cache_key(prompt, temperature, max_tokens, cache)
+        if key is not None:
+            hit = self._responses.get(key)
+            if hit is None:
+                hit = self._from_disk(key)
+            if hit is not None:
+                return hit
+
+        response = self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                SYSTEM_MESSAGE,
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
+        )
+        text = response.choices[0].message.content.strip()
+        if key is not None:
+            self._store(key, text)
+        return text
+
+    async def agenerate(self, prompt, temperature=0.1, max_tokens=None, cache=True):
+        """Async version of generate; does not tie up a worker thread."""
+        key = self._cache_key(prompt, temperature, max_tokens, cache)
+        if key is not None:
+            hit = self._responses.get(key)
+            if hit is None:
+                hit = await asyncio.to_thread(self._from_disk, key)
+            if hit is not None:
+                return hit
+
+        response = await self.aclient.chat.completions.create(
+            model=self.model,
+            messages=[
+                SYSTEM_MESSAGE,
+                {"role": "user", "content": prompt}
+            ],
+            temperature=temperature,
+            max_tokens=max_tokens
         )
-        self.model = os.getenv("GROQ_MODEL", "llama3-70b-8192")
+        text = response.choices[0].message.content.strip()
+        if key is not None:
+            await asyncio.to_thread(self._store, key, text)
+        return text
 
-    def generate(self, prompt, temperature=0.1):
+    def stream(self, prompt, temperature=0.1):
+        """Yields the response text chunk by chunk as the model produces it."""
         response = self.client.chat.completions.create(
             model=self.model,
             messages=[
-                {"role": "system", "content": "You are an expert SQL generator."},
+                SYSTEM_MESSAGE,
                 {"role": "user", "content": prompt}
             ],
-            temperature=temperature
+            temperature=temperature,
+            stream=True
         )
-        return response.choices[0].message.content.strip()
+        for chunk in response:
+            delta = chunk.choices[0].delta.content if chunk.choices else None
+            if delta:
+                yield delta
+
+    def warmup(self):
+        """Opens a pooled connection (DNS, TLS, HTTP/2) with a cheap request."""
+        self.client.models.list()
+
+    async def awarmup(self):
+        """Same for the async pool, which SQL generation and final answers use."""
+        await self.aclient.models.list()
+
+    def close(self):
+        """Closes the pooled HTTP connections."""
+        if self._http is not None:
+            self._http.close()
+
+    async def aclose(self):
+        """Closes the async pool."""
+        if self._ahttp is not None:
+            await self._ahttp.aclose()
+
+
+@lru_cache(maxsize=1)
+def get_groq_client() -> GroqClient:
+    """The process-wide GroqClient, so every caller shares its connection pools."""
+    return GroqClient()
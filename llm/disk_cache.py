@@ -0,0 +1,122 @@
+"""
+Persistent LLM Response Cache
+
+SQLite-backed key/value store for LLM responses that should survive a
+restart: generated SQL, and cacheable GroqClient completions whose caller
+keeps no cache of its own. Keys come from llm.cache.prompt_key; prompts
+embed the schema they were built from, so entries for a changed schema
+are simply never hit again and age out after `ttl`.
+
+Set LLM_CACHE_PATH to choose the file, or to an empty string to disable.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Optional
+
+
+DEFAULT_CACHE_PATH = os.path.join(os.path.expanduser("~"), ".cache", "nl2sql", "llm_cache.sqlite")
+DEFAULT_TTL = 7 * 24 * 3600  # seconds
+
+
+class DiskCache:
+    """
+    Thread-safe persistent cache. The file is opened on first use; if it
+    cannot be opened the cache disables itself and every lookup misses.
+    """
+
+    def __init__(self, path: Optional[str], ttl: float = DEFAULT_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._conn: Optional[sqlite3.Connection] = None
+        self._disabled = not path
+        self._lock = threading.Lock()
+
+    def _connect(self) -> Optional[sqlite3.Connection]:
+        # Caller holds the lock
+        if self._conn is None and not self._disabled:
+            try:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                conn = sqlite3.connect(self.path, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS llm_cache ("
+                    "key BLOB PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)"
+                )
+                # Entries past their TTL are dropped once per process
+                conn.execute("DELETE FROM llm_cache WHERE expires_at < ?", (time.time(),))
+                conn.commit()
+                self._conn = conn
+            except (OSError, sqlite3.Error) as e:
+                print(f"[WARN] LLM disk cache disabled: {e}")
+                self._disabled = True
+        return self._conn
+
+    def get(self, key: bytes) -> Optional[str]:
+        with self._lock:
+            conn = self._connect()
+            row = None
+            if conn is not None:
+                row = conn.execute(
+                    "SELECT value FROM llm_cache WHERE key = ? AND expires_at >= ?",
+                    (key, time.time())
+                ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: bytes, value: str, ttl: Optional[float] = None):
+        """Stores `value` for `ttl` seconds (default: the cache's ttl)."""
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    "INSERT OR REPLACE INTO llm_cache (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, value, expires_at)
+                )
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[WARN] LLM disk cache write failed: {e}")
+
+    def discard(self, key: bytes):
+        """Drops one entry, e.g. SQL that turned out not to execute."""
+        with self._lock:
+            conn = self._connect()
+            if conn is None:
+                return
+            try:
+                conn.execute("DELETE FROM llm_cache WHERE key = ?", (key,))
+                conn.commit()
+            except sqlite3.Error as e:
+                print(f"[WARN] LLM disk cache write failed: {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": not self._disabled,
+            "cache_hits": self.hits,
+            "cache_misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+        }
+
+    def close(self):
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+# Shared by every SQL-generation call in the process, and by GroqClient as
+# the second tier of its response cache for direct generate() calls (keys
+# are namespaced, see prompt_key)
+LLM_DISK_CACHE = DiskCache(os.getenv("LLM_CACHE_PATH", DEFAULT_CACHE_PATH))
@@ -2,13 +2,20 @@
 Centralized prompt templates for the NL → SQL system.
 
 All LLM behavior should be controlled from this file.
+
+Set VERBOSE_PROMPT=1 to send the long-form intent-aware instructions and
+decorated section banners instead of the compact default.
 """
 
+import os
+
+VERBOSE_PROMPT = bool(os.getenv("VERBOSE_PROMPT"))
+
 # ---------------------------
 # ENHANCED INTENT-AWARE SYSTEM PROMPT
 # ---------------------------
 
-INTENT_AWARE_SQL_PROMPT = """
+_VERBOSE_INTENT_AWARE_SQL_PROMPT = """
 You are an intent-aware Natural Language to SQL generator.
 
 Your task is to generate LOGICALLY CORRECT, read-only SQL queries.
@@ -103,6 +110,82 @@ Before returning SQL, verify:
 - Query matches the formal intent exactly
 """
 
+# Same rules without rulers, repeated bullets or the final checklist
+# (already covered by the UNIVERSAL strategy). Kept in pieces so that
+# intent_aware_sql_prompt can drop the parts for intents other than the
+# one already detected.
+_COMPACT_HEADER = """
+You are an intent-aware Natural Language to SQL generator.
+Generate LOGICALLY CORRECT, read-only SQL; correctness of meaning beats short SQL.
+"""
+
+_COMPACT_INTENT_ANALYSIS = """
+STEP 1: INTENT ANALYSIS
+Classify the question into one or more intent types:
+EXISTENTIAL (at least one), UNIVERSAL (only / never / every / all),
+ABSENCE (none / without / has not), SET_INTERSECTION (both X and Y across rows),
+AGGREGATION (top, most, least, total, average).
+Words like "only", "never", "every", "all", "nothing else" MUST be UNIVERSAL.
+"""
+
+_COMPACT_TRANSLATION = """
+STEP 2: FORMAL INTENT TRANSLATION
+Rewrite the question as explicit constraints before writing SQL. E.g.
+"Customers who ordered only discontinued products": Entity: Customer; has at
+least one order; has NOT ordered any non-discontinued product.
+"""
+
+_COMPACT_STRATEGIES = {
+    "UNIVERSAL": "- UNIVERSAL: NOT EXISTS (mandatory), plus EXISTS/JOIN for at least one valid related row",
+    "ABSENCE": "- ABSENCE: LEFT JOIN + IS NULL, or NOT EXISTS",
+    "SET_INTERSECTION": "- SET_INTERSECTION: GROUP BY + HAVING COUNT(DISTINCT ...)",
+    "EXISTENTIAL": "- EXISTENTIAL: EXISTS or INNER JOIN",
+}
+
+# Only offered once the intent is known; the generic prompt leaves
+# aggregations to the model
+_COMPACT_AGGREGATION_STRATEGY = "- AGGREGATION: GROUP BY with the aggregate; ORDER BY + LIMIT for top / most / least"
+
+_COMPACT_RULES = """
+STEP 4: RULES
+Read-only SELECT only (no INSERT/UPDATE/DELETE/DROP/ALTER), no SELECT *, explicit
+columns, NULL-aware (IS NULL / IS NOT NULL), booleans compared as INTEGER 0/1.
+
+STEP 5: OUTPUT FORMAT (MANDATORY, in this order)
+INTENT:
+[intent classification]
+
+REASONING:
+- Entity: [what is queried]
+- Constraint 1: [first constraint]
+- Constraint 2: [second constraint]
+- SQL Strategy: [pattern]
+
+SQL:
+[query - NO markdown, NO comments]
+
+SQL must NEVER be shown without reasoning.
+"""
+
+def _compact_intent_prompt(intent_type=None):
+    """The compact prompt, specialized to `intent_type` when it is given."""
+    if intent_type is None:
+        analysis = _COMPACT_INTENT_ANALYSIS
+        strategies = "\n".join(_COMPACT_STRATEGIES.values())
+    else:
+        analysis = f"\nSTEP 1: INTENT\nAlready detected: {intent_type}.\n"
+        strategies = _COMPACT_STRATEGIES.get(intent_type, _COMPACT_AGGREGATION_STRATEGY)
+    return (
+        _COMPACT_HEADER + analysis + _COMPACT_TRANSLATION
+        + "\nSTEP 3: SQL STRATEGY\n" + strategies + "\n" + _COMPACT_RULES
+    )
+
+_COMPACT_INTENT_AWARE_SQL_PROMPT = _compact_intent_prompt()
+
+INTENT_AWARE_SQL_PROMPT = (
+    _VERBOSE_INTENT_AWARE_SQL_PROMPT if VERBOSE_PROMPT else _COMPACT_INTENT_AWARE_SQL_PROMPT
+)
+
 # ---------------------------
 # SQL SYSTEM PROMPT (Legacy - Keep for compatibility)
 # ---------------------------
@@ -123,10 +206,44 @@ Strict rules:
 - If something is not possible with the given schema, say so clearly
 """
 
+def section_heading(title, indent=0, width=51):
+    """
+    Section heading for a prompt: "## title" by default. With VERBOSE_PROMPT
+    it is the original full-width banner of `width` rulers, with the title
+    indented by `indent` spaces as the hand-laid prompts had it.
+    """
+    if VERBOSE_PROMPT:
+        banner = "═" * width
+        return f"{banner}\n{' ' * indent}{title}\n{banner}"
+    return f"## {title}"
+
+def _literal(text):
+    """Escapes braces so static text can be embedded in a format template."""
+    return text.replace("{", "{{").replace("}", "}}")
+
 # ---------------------------
 # SQL GENERATION PROMPT
 # ---------------------------
 
+# Built once at import; calls only fill in the placeholders
+_SQL_GENERATION_TEMPLATE = """
+""" + _literal(SQL_SYSTEM_PROMPT) + """
+
+Database Schema (ONLY these tables and columns exist):
+{schema}
+
+Reasoning Plan:
+{plan}
+
+User Question:
+{question}
+
+Output:
+- Generate ONLY the SQL query
+- No explanations
+- No markdown
+"""
+
 def sql_generation_prompt(schema, plan, question):
     """
     Prompt used to generate SQL from a user question.
@@ -140,27 +257,54 @@ def sql_generation_prompt(schema, plan, question):
         str: formatted prompt
     """
 
-    return f"""
-{SQL_SYSTEM_PROMPT}
+    return _SQL_GENERATION_TEMPLATE.format_map({"schema": schema, "plan": plan, "question": question})
 
-Database Schema (ONLY these tables and columns exist):
+# ---------------------------
+# INTENT-AWARE SQL GENERATION (NEW)
+# ---------------------------
+
+_INTENT_HINTS = {
+    "UNIVERSAL": """
+⚠️ UNIVERSAL INTENT DETECTED
+This query uses words like "only", "never", "every".
+You MUST use NOT EXISTS to enforce the universal constraint.
+""",
+    "SET_INTERSECTION": """
+⚠️ SET INTERSECTION DETECTED
+This query requires matching multiple conditions.
+Use GROUP BY + HAVING COUNT(DISTINCT ...) for single-pass efficiency.
+""",
+}
+
+def _intent_aware_template(intent_type=None):
+    if intent_type is None or VERBOSE_PROMPT:
+        instructions = INTENT_AWARE_SQL_PROMPT
+    else:
+        instructions = _compact_intent_prompt(intent_type)
+    return """
+""" + _literal(instructions) + """
+
+""" + _literal(_INTENT_HINTS.get(intent_type, "")) + """
+
+""" + section_heading("DATABASE SCHEMA", 20) + """
 {schema}
 
-Reasoning Plan:
+""" + section_heading("QUERY PLAN", 22) + """
 {plan}
 
-User Question:
+""" + section_heading("USER QUESTION", 20) + """
 {question}
 
-Output:
-- Generate ONLY the SQL query
-- No explanations
-- No markdown
+""" + section_heading("YOUR RESPONSE", 20) + """
+INTENT:
 """
 
-# ---------------------------
-# INTENT-AWARE SQL GENERATION (NEW)
-# ---------------------------
+# One template per known intent, carrying only that intent's strategy
+# (None: unknown intent, full prompt). Verbose mode always sends the full prompt.
+_INTENT_AWARE_TEMPLATES = {
+    intent_type: _intent_aware_template(intent_type)
+    for intent_type in (None, *_COMPACT_STRATEGIES, "AGGREGATION")
+}
 
 def intent_aware_sql_prompt(schema, plan, question, intent_type=None):
     """
@@ -176,45 +320,12 @@ def intent_aware_sql_prompt(schema, plan, question, intent_type=None):
         str: Formatted prompt for LLM
     """
     
-    intent_hint = ""
-    if intent_type == "UNIVERSAL":
-        intent_hint = """
-⚠️ UNIVERSAL INTENT DETECTED
-This query uses words like "only", "never", "every".
-You MUST use NOT EXISTS to enforce the universal constraint.
-"""
-    elif intent_type == "SET_INTERSECTION":
-        intent_hint = """
-⚠️ SET INTERSECTION DETECTED
-This query requires matching multiple conditions.
-Use GROUP BY + HAVING COUNT(DISTINCT ...) for single-pass efficiency.
-"""
-    
-    return f"""
-{INTENT_AWARE_SQL_PROMPT}
-
-{intent_hint}
-
-═══════════════════════════════════════════════════
-                    DATABASE SCHEMA
-═══════════════════════════════════════════════════
-{schema}
-
-═══════════════════════════════════════════════════
-                      QUERY PLAN
-═══════════════════════════════════════════════════
-{plan}
-
-═══════════════════════════════════════════════════
-                    USER QUESTION
-═══════════════════════════════════════════════════
-{question}
-
-═══════════════════════════════════════════════════
-                    YOUR RESPONSE
-═══════════════════════════════════════════════════
-INTENT:
-"""
+    template = _INTENT_AWARE_TEMPLATES.get(intent_type, _INTENT_AWARE_TEMPLATES[None])
+    return template.format_map({
+        "schema": schema,
+        "plan": plan,
+        "question": question
+    })
 
 # ---------------------------
 # AMBIGUITY CLARIFICATION PROMPT
@@ -240,12 +351,7 @@ Be concise and polite.
 # PLANNER PROMPT (OPTIONAL)
 # ---------------------------
 
-def planner_prompt(schema, question):
-    """
-    Prompt for generating a reasoning plan before SQL generation.
-    """
-
-    return f"""
+_PLANNER_TEMPLATE = """
 You are an analytical planner.
 
 Given the database schema and the user question,
@@ -263,16 +369,18 @@ Output:
 - Mention filters or aggregations
 """
 
+def planner_prompt(schema, question):
+    """
+    Prompt for generating a reasoning plan before SQL generation.
+    """
+
+    return _PLANNER_TEMPLATE.format_map({"schema": schema, "question": question})
+
 # ---------------------------
 # RESULT INTERPRETATION PROMPT (OPTIONAL)
 # ---------------------------
 
-def result_interpretation_prompt(question, sql, rows_preview):
-    """
-    Prompt to convert raw SQL results into natural language.
-    """
-
-    return f"""
+_RESULT_INTERPRETATION_TEMPLATE = """
 You are a data analyst.
 
 User Question:
@@ -287,3 +395,12 @@ Result Preview:
 Explain the result clearly in natural language.
 """
 
+def result_interpretation_prompt(question, sql, rows_preview):
+    """
+    Prompt to convert raw SQL results into natural language.
+    """
+
+    return _RESULT_INTERPRETATION_TEMPLATE.format_map(
+        {"question": question, "sql": sql, "rows_preview": rows_preview}
+    )
+
@@ -6,8 +6,44 @@ Implements the "think, explore, validate, and recover from mistakes" paradigm.
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, Optional, List, Tuple
 
+from utils.cache import TTLCache
+
+try:
+    from rapidfuzz.fuzz import ratio as _fuzz_ratio
+
+    def _similarity(s1: str, s2: str, score_cutoff: float = 0.0) -> float:
+        """
+        Indel similarity 2 * LCS / (len(s1) + len(s2)), in 0-1; 0 when it
+        is below score_cutoff (rapidfuzz then stops early).
+        """
+        return _fuzz_ratio(s1, s2, score_cutoff=score_cutoff * 100) / 100 if s1 and s2 else 0.0
+except ImportError:
+    def _similarity(s1: str, s2: str, score_cutoff: float = 0.0) -> float:
+        """Indel similarity 2 * LCS / (len(s1) + len(s2)), in 0-1."""
+        if not s1 or not s2:
+            return 0.0
+        # Longest common subsequence, one DP row at a time
+        prev = [0] * (len(s2) + 1)
+        for c1 in s1:
+            row = [0]
+            for j, c2 in enumerate(s2):
+                row.append(prev[j] + 1 if c1 == c2 else max(prev[j + 1], row[j]))
+            prev = row
+        return 2 * prev[-1] / (len(s1) + len(s2))
+
+
+# A comma left dangling before a clause keyword or the end of the query
+_TRAILING_COMMA_RE = re.compile(r',\s*(?=(?:FROM|WHERE|GROUP|ORDER|LIMIT|;|$))', re.IGNORECASE)
+
+
+@lru_cache(maxsize=128)
+def _word_boundary_re(word: str) -> "re.Pattern":
+    """Case-insensitive whole-word pattern for `word`, compiled once."""
+    return re.compile(rf'\b{re.escape(word)}\b', re.IGNORECASE)
+
 
 class QueryCorrector:
     """
@@ -16,6 +52,10 @@ class QueryCorrector:
     
     MAX_RETRIES = 2
     
+    # Minimum similarity for suggesting a column that is neither a case
+    # variant nor a substring of the unknown one
+    SIMILARITY_CUTOFF = 0.7
+    
     # Common error patterns and their fixes
     ERROR_PATTERNS = {
         r"no such column: ([\w.]+)": "column_not_found",  # Matches table.column or column
@@ -23,8 +63,8 @@ class QueryCorrector:
         r"ambiguous column name: (\w+)": "ambiguous_column",
         r"near ['\"]primary['\"]": "reserved_word_primary",
         r"near ['\"]([A-Za-z]+)['\"].*syntax error": "syntax_near_keyword",
-        r"syntax error": "syntax_error",
         r"near \"(.+?)\": syntax error": "syntax_near",
+        r"syntax error": "syntax_error",
         r"UNIQUE constraint failed": "unique_violation",
         r"GROUP BY clause": "group_by_needed",
         r"aggregate": "aggregate_error",
@@ -40,15 +80,42 @@ class QueryCorrector:
 
     }
     
-    def __init__(self, schema: Dict):
+    # Compiled once, in ERROR_PATTERNS order (first match wins). Kept as
+    # separate patterns: each one's literal prefix lets re skip ahead, which
+    # a single alternation of all of them loses
+    _COMPILED_PATTERNS = tuple(
+        (re.compile(pattern, re.IGNORECASE), error_type)
+        for pattern, error_type in ERROR_PATTERNS.items()
+    )
+    
+    def __init__(self, schema: Dict, all_columns: Optional[Dict[str, List[str]]] = None):
         self.schema = schema
-        self.all_columns = self._extract_all_columns()
+        # Column -> tables map; callers that already have one can pass it in
+        self.all_columns = all_columns if all_columns is not None else self._extract_all_columns()
         self.all_tables = list(schema.keys())
+        # Lowercased names for the case-insensitive lookups; the first name
+        # wins when several differ only in case
+        self._columns_lc = [(col, col.lower()) for col in self.all_columns]
+        self._tables_lc = [(table, table.lower()) for table in self.all_tables]
+        self._columns_by_lc = {}
+        for col, col_lower in self._columns_lc:
+            self._columns_by_lc.setdefault(col_lower, col)
+        self._tables_by_lc = {}
+        for table, table_lower in self._tables_lc:
+            self._tables_by_lc.setdefault(table_lower, table)
+        # error message -> analyze_error result; the same error tends to
+        # come back on every retry of a question
+        self._analyses = TTLCache(maxsize=256)
     
     def _extract_all_columns(self) -> Dict[str, List[str]]:
         """Extracts all columns mapped to their tables."""
+        return self.column_map(self.schema)
+    
+    @staticmethod
+    def column_map(schema: Dict) -> Dict[str, List[str]]:
+        """Maps every column name to the tables that contain it."""
         columns = {}
-        for table, info in self.schema.items():
+        for table, info in schema.items():
             for col in info.get("columns", []):
                 if col not in columns:
                     columns[col] = []
@@ -58,11 +125,19 @@ class QueryCorrector:
     def analyze_error(self, error_message: str, sql: str) -> Dict:
         """
         Analyzes an error and suggests corrections.
+
+        The analysis depends only on the message and the schema, so it is
+        cached per message; callers get their own copy.
         """
-        error_lower = error_message.lower()
-        
-        for pattern, error_type in self.ERROR_PATTERNS.items():
-            match = re.search(pattern, error_message, re.IGNORECASE)
+        fix = self._analyses.get(error_message)
+        if fix is None:
+            fix = self._analyze_error(error_message, sql)
+            self._analyses.set(error_message, fix)
+        return dict(fix)
+    
+    def _analyze_error(self, error_message: str, sql: str) -> Dict:
+        for pattern, error_type in self._COMPILED_PATTERNS:
+            match = pattern.search(error_message)
             if match:
                 return self._get_fix_for_error(
                     error_type, 
@@ -92,14 +167,13 @@ class QueryCorrector:
             column_name_only = column.split('.')[-1] if '.' in column else column
             
             # Check if column name matches a table name (case-insensitive)
-            for table_name in self.all_tables:
-                if column_name_only.lower() == table_name.lower():
-                    potential_table = table_name
-                    # Look for a foreign key column like "{table}Id"
-                    fk_column = f"{table_name}Id"
-                    if fk_column in self.all_columns:
-                        fk_hint = f"Column '{column}' doesn't exist. Did you mean to JOIN with the {table_name} table? The relationship is through '{fk_column}'."
-                    break
+            table_name = self._tables_by_lc.get(column_name_only.lower())
+            if table_name is not None:
+                potential_table = table_name
+                # Look for a foreign key column like "{table}Id"
+                fk_column = f"{table_name}Id"
+                if fk_column in self.all_columns:
+                    fk_hint = f"Column '{column}' doesn't exist. Did you mean to JOIN with the {table_name} table? The relationship is through '{fk_column}'."
             
             if fk_hint:
                 # This is likely a FK relationship error
@@ -120,7 +194,8 @@ class QueryCorrector:
                 "suggestion": f"Column '{column}' doesn't exist.",
                 "can_retry": bool(similar),
                 "fix_hint": f"Did you mean '{similar}'?" if similar else None,
-                "replacement": (column, similar) if similar else None
+                "replacement": (column, similar) if similar else None,
+                "confidence": self._match_confidence(column_name_only, similar)
             }
         
         elif error_type == "table_not_found":
@@ -131,7 +206,8 @@ class QueryCorrector:
                 "suggestion": f"Table '{table}' doesn't exist.",
                 "can_retry": bool(similar),
                 "fix_hint": f"Did you mean '{similar}'?" if similar else None,
-                "replacement": (table, similar) if similar else None
+                "replacement": (table, similar) if similar else None,
+                "confidence": self._match_confidence(table, similar)
             }
         
         elif error_type == "ambiguous_column":
@@ -222,31 +298,45 @@ class QueryCorrector:
     
     def _find_similar_column(self, column: str) -> Optional[str]:
         column_lower = column.lower()
-        for col in self.all_columns.keys():
-            if col.lower() == column_lower:
-                return col
-        for col in self.all_columns.keys():
-            if column_lower in col.lower() or col.lower() in column_lower:
-                return col
-        for col in self.all_columns.keys():
-            if self._simple_similarity(column_lower, col.lower()) > 0.7:
+        col = self._columns_by_lc.get(column_lower)
+        if col is not None:
+            return col
+        for col, col_lower in self._columns_lc:
+            if column_lower in col_lower or col_lower in column_lower:
                 return col
-        return None
+        best, best_score = None, self.SIMILARITY_CUTOFF
+        length = len(column_lower)
+        for col, col_lower in self._columns_lc:
+            # LCS <= the shorter length, so names too different in length
+            # cannot beat best_score; skip them without comparing characters
+            col_length = len(col_lower)
+            if 2 * min(length, col_length) <= best_score * (length + col_length):
+                continue
+            score = _similarity(column_lower, col_lower, best_score)
+            if score > best_score:
+                best, best_score = col, score
+        return best
     
     def _find_similar_table(self, table: str) -> Optional[str]:
         table_lower = table.lower()
-        for t in self.all_tables:
-            if t.lower() == table_lower:
-                return t
-        for t in self.all_tables:
-            if table_lower in t.lower() or t.lower() in table_lower:
+        t = self._tables_by_lc.get(table_lower)
+        if t is not None:
+            return t
+        for t, t_lower in self._tables_lc:
+            if table_lower in t_lower or t_lower in table_lower:
                 return t
         return None
     
-    def _simple_similarity(self, s1: str, s2: str) -> float:
-        if not s1 or not s2: return 0.0
-        common = set(s1) & set(s2)
-        return len(common) / max(len(set(s1)), len(set(s2)))
+    def _match_confidence(self, name: str, similar: Optional[str]) -> float:
+        """How likely `similar` is the identifier that `name` meant (0-1)."""
+        if not similar:
+            return 0.0
+        name_lower, similar_lower = name.lower(), similar.lower()
+        if name_lower == similar_lower:
+            return 1.0
+        if name_lower in similar_lower or similar_lower in name_lower:
+            return 0.8
+        return 0.5
     
     def apply_fix(self, sql: str, fix_info: Dict) -> Optional[str]:
         if not fix_info.get("can_retry"):
@@ -258,61 +348,21 @@ class QueryCorrector:
             replacement = fix_info.get("replacement")
             if replacement:
                 old, new = replacement
-                return re.sub(rf'\b{re.escape(old)}\b', new, sql, flags=re.IGNORECASE)
+                return _word_boundary_re(old).sub(new, sql)
         
         elif error_type == "syntax_near":
             suggestion = fix_info.get("suggestion", "")
             if "," in suggestion:
                 # Fix trailing commas before keywords
                 # e.g., "SELECT a, b, FROM t" -> "SELECT a, b FROM t"
-                fixed_sql = re.sub(r',\s*(?=(?:FROM|WHERE|GROUP|ORDER|LIMIT|;|$))', ' ', sql, flags=re.IGNORECASE)
+                fixed_sql = _TRAILING_COMMA_RE.sub(' ', sql)
                 if fixed_sql != sql:
                     return fixed_sql
         
         return None
 
 
-def generate_retry_prompt(original_question: str, original_sql: str, error_message: str, fix_info: Dict, schema: Dict) -> str:
-    # Enhanced schema display with foreign keys
-    schema_lines = []
-    for table, info in schema.items():
-        columns_str = ', '.join(info.get('columns', []))
-        schema_lines.append(f"Table {table}: {columns_str}")
-        
-        # Add foreign key information if available
-        fks = info.get('foreign_keys', [])
-        if fks:
-            for fk in fks:
-                schema_lines.append(f"  └─ FK: {fk.get('from')} → {fk.get('to_table')}.{fk.get('to_column')}")
-    
-    schema_text = "\n".join(schema_lines)
-    
-    # Add FK relationship hint if detected
-    join_hint = ""
-    if fix_info.get('requires_join'):
-        join_table = fix_info.get('join_table', '')
-        join_hint = f"\n\nIMPORTANT: You need to JOIN with the {join_table} table to access its columns."
-    
-    return f"""The previous SQL query failed. Please generate a corrected query.
-
-ORIGINAL QUESTION:
-{original_question}
-
-PREVIOUS SQL (FAILED):
-{original_sql}
-
-ERROR:
-{error_message}
-
-ANALYSIS:
-{fix_info.get('suggestion', 'Unknown error')}
-
-HINT:
-{fix_info.get('fix_hint', 'Please try a different approach.')}{join_hint}
-
-AVAILABLE SCHEMA:
-{schema_text}
-
+_RETRY_PROMPT_FOOTER = """
 Please generate a corrected SQL query that:
 1. Avoids the previous error
 2. Uses only existing tables and columns
@@ -326,3 +376,74 @@ REASONING:
 SQL:
 <Your corrected SQL query>
 """
+
+
+def render_retry_table(table: str, info: Dict) -> str:
+    """Renders one table (columns, then foreign keys) for the retry prompt."""
+    lines = [f"Table {table}: {', '.join(info.get('columns', []))}"]
+    for fk in info.get('foreign_keys') or ():
+        lines.append(f"  └─ FK: {fk.get('from')} → {fk.get('to_table')}.{fk.get('to_column')}")
+    return "\n".join(lines)
+
+
+def generate_retry_prompt(
+    original_question: str,
+    original_sql: str,
+    error_message: str,
+    fix_info: Dict,
+    schema: Dict,
+    blocks=None
+) -> str:
+    """
+    Prompt for regenerating SQL after `original_sql` failed.
+
+    Args:
+        blocks: Optional per-session cache (get/set, e.g. TTLCache) of
+            rendered tables keyed by (table, columns), so retries do not
+            re-render the same tables
+    """
+    # Add FK relationship hint if detected
+    join_hint = ""
+    if fix_info.get('requires_join'):
+        join_table = fix_info.get('join_table', '')
+        join_hint = f"\n\nIMPORTANT: You need to JOIN with the {join_table} table to access its columns."
+    
+    # One line per part, joined once at the end
+    parts = [
+        "The previous SQL query failed. Please generate a corrected query.",
+        "",
+        "ORIGINAL QUESTION:",
+        original_question,
+        "",
+        "PREVIOUS SQL (FAILED):",
+        original_sql,
+        "",
+        "ERROR:",
+        error_message,
+        "",
+        "ANALYSIS:",
+        str(fix_info.get('suggestion', 'Unknown error')),
+        "",
+        "HINT:",
+        f"{fix_info.get('fix_hint', 'Please try a different approach.')}{join_hint}",
+        "",
+        "AVAILABLE SCHEMA:",
+    ]
+    
+    # Enhanced schema display with foreign keys
+    for table, info in schema.items():
+        if blocks is None:
+            parts.append(render_retry_table(table, info))
+            continue
+        
+        key = (table, tuple(info.get('columns', [])))
+        block = blocks.get(key)
+        if block is None:
+            block = render_retry_table(table, info)
+            blocks.set(key, block)
+        parts.append(block)
+    if not schema:
+        parts.append("")
+    
+    parts.append(_RETRY_PROMPT_FOOTER)
+    return "\n".join(parts)
@@ -8,9 +8,79 @@ Handles all complexity levels:
 - Multi-step reasoning (customers who purchased from both X and Y)
 """
 
+import asyncio
 import re
 from typing import Dict, Tuple, Optional
 
+from llm.cache import prompt_key
+from llm.disk_cache import LLM_DISK_CACHE
+from llm.prompt_templates import VERBOSE_PROMPT, section_heading
+
+
+# Section headings in the generation prompt: one-line by default, the
+# full-width banners with VERBOSE_PROMPT=1 (see section_heading)
+_H = {
+    key: section_heading(title, indent, width=67)
+    for key, title, indent in (
+        ("previous", "PREVIOUS ATTEMPT (FAILED)", 21),
+        ("pipeline", "MANDATORY 5-STEP PIPELINE", 24),
+        ("optimization", "OPTIMIZATION RULES", 25),
+        ("inference", "SCHEMA-AWARE VALUE INFERENCE", 19),
+        ("rules", "CRITICAL SQL RULES", 25),
+        ("schema", "DATABASE SCHEMA", 24),
+        ("plan", "QUERY PLAN", 25),
+        ("question", "USER QUESTION", 23),
+        ("response", "YOUR RESPONSE", 23),
+    )
+}
+
+
+# Per-intent SQL patterns for the generation prompt, in prompt order. When
+# the planner matched an explicit keyword for one of the narrower intents,
+# only that intent's pattern is sent (see _intent_patterns).
+_INTENT_PATTERNS = {
+    "EXISTENTIAL": """✅ EXISTENTIAL ("has", "with", "containing"):
+   - Use EXISTS instead of JOIN when only checking existence
+   - EXISTS stops at first match (faster than JOIN)
+   - Example: SELECT c.* FROM Customer c WHERE EXISTS (SELECT 1 FROM Invoice i WHERE i.CustomerId = c.CustomerId)
+
+""",
+    "UNIVERSAL": """✅ UNIVERSAL ("only", "every", "all"):
+   - Use NOT EXISTS for anti-joins (most efficient)
+   - Example: Customers who only bought Rock → use NOT EXISTS to exclude other genres
+
+""",
+    "SET_INTERSECTION": """✅ SET_INTERSECTION ("both X and Y"):
+   - Use GROUP BY + HAVING COUNT(DISTINCT ...) = N (single pass)
+   - Avoid multiple subqueries
+   - Example: GROUP BY customer HAVING COUNT(DISTINCT genre) = 2
+
+""",
+    "ABSENCE": """✅ ABSENCE ("never", "without", "no"):
+   - Use NOT EXISTS or LEFT JOIN + IS NULL  
+   - NOT EXISTS is usually faster
+   - Example: SELECT c.* FROM Customer c WHERE NOT EXISTS (SELECT 1 FROM Invoice i WHERE i.CustomerId = c.CustomerId)
+
+""",
+    "AGGREGATION": """✅ AGGREGATION/RANKING ("top", "most", "average"):
+   - Use ORDER BY + LIMIT (no DISTINCT RANK needed)
+   - Apply LIMIT to cap results
+   - Example: ORDER BY total DESC LIMIT 5
+
+""",
+}
+
+# EXISTENTIAL is also the planner's fallback when nothing matched, so it is
+# never trusted enough to drop the other patterns
+_CONFIDENT_INTENTS = ("UNIVERSAL", "SET_INTERSECTION", "ABSENCE", "AGGREGATION")
+
+
+def _intent_patterns(intent_type: Optional[str]) -> str:
+    """Pattern-selection text for the prompt: all intents unless one is certain."""
+    if intent_type in _CONFIDENT_INTENTS and not VERBOSE_PROMPT:
+        return _INTENT_PATTERNS[intent_type]
+    return "".join(_INTENT_PATTERNS.values())
+
 
 class SQLGenerationError(Exception):
     """Raised when SQL generation or parsing fails."""
@@ -22,17 +92,23 @@ def generate_sql_with_reasoning(
     plan: Dict,
     schema: Dict,
     question: str,
-    retry_context: str = ""
+    retry_context: str = "",
+    schema_blocks=None
 ) -> Dict:
     """
     Generates SQL query with detailed reasoning.
     
+    Responses that parse are kept in the persistent LLM_DISK_CACHE, so the same
+    prompt is answered from disk across sessions and restarts. The entry's
+    key is returned as 'cache_key' so callers can discard SQL that fails.
+    
     Args:
         llm_client: LLM client instance
         plan: Query plan from planner
         schema: Refined database schema
         question: User's question with context
         retry_context: Optional context from previous failed attempts
+        schema_blocks: Optional cache of rendered tables (see format_schema_for_prompt)
     
     Returns:
         dict with 'sql', 'reasoning', 'plan_summary'
@@ -41,7 +117,48 @@ def generate_sql_with_reasoning(
         SQLGenerationError: If output format is invalid
     """
     
-    schema_text = format_schema_for_prompt(schema)
+    prompt, plan_text, complexity = _prepare_prompt(plan, schema, question, retry_context, schema_blocks)
+    key = prompt_key("generate_sql", getattr(llm_client, "model", ""), prompt, 0.1)
+    
+    raw_response = LLM_DISK_CACHE.get(key)
+    if raw_response is not None:
+        return _parse_result(raw_response, plan_text, complexity, key)
+    
+    raw_response = llm_client.generate(prompt, temperature=0.1, cache=False)
+    result = _parse_result(raw_response, plan_text, complexity, key)
+    LLM_DISK_CACHE.set(key, raw_response)
+    return result
+
+
+async def agenerate_sql_with_reasoning(
+    llm_client,
+    plan: Dict,
+    schema: Dict,
+    question: str,
+    retry_context: str = "",
+    schema_blocks=None
+) -> Dict:
+    """
+    Async version of generate_sql_with_reasoning, using `llm_client.agenerate`.
+    """
+    
+    prompt, plan_text, complexity = _prepare_prompt(plan, schema, question, retry_context, schema_blocks)
+    key = prompt_key("generate_sql", getattr(llm_client, "model", ""), prompt, 0.1)
+    
+    raw_response = await asyncio.to_thread(LLM_DISK_CACHE.get, key)
+    if raw_response is not None:
+        return _parse_result(raw_response, plan_text, complexity, key)
+    
+    raw_response = await llm_client.agenerate(prompt, temperature=0.1, cache=False)
+    result = _parse_result(raw_response, plan_text, complexity, key)
+    await asyncio.to_thread(LLM_DISK_CACHE.set, key, raw_response)
+    return result
+
+
+def _prepare_prompt(plan: Dict, schema: Dict, question: str, retry_context: str, schema_blocks=None) -> Tuple[str, str, str]:
+    """Returns (prompt, plan_text, complexity) for one generation call."""
+    
+    schema_text = format_schema_for_prompt(schema, schema_blocks)
     plan_text = format_plan_for_prompt(plan)
     
     # Detect query complexity for appropriate prompting
@@ -56,14 +173,18 @@ def generate_sql_with_reasoning(
         question=question,
         complexity=complexity,
         retry_context=retry_context,
-        value_inference_guide=value_inference_guide
+        value_inference_guide=value_inference_guide,
+        intent_type=plan.get("intent_type")
     )
-    
-    raw_response = llm_client.generate(prompt, temperature=0.1)
-    
+    return prompt, plan_text, complexity
+
+
+def _parse_result(raw_response: str, plan_text: str, complexity: str, cache_key: Optional[bytes] = None) -> Dict:
     result = parse_llm_response(raw_response)
     result["plan_summary"] = plan_text
     result["complexity"] = complexity
+    # Lets the caller drop the cached response if the SQL fails to execute
+    result["cache_key"] = cache_key
     
     return result
 
@@ -74,9 +195,10 @@ def _build_prompt(
     question: str,
     complexity: str,
     retry_context: str = "",
-    value_inference_guide: str = ""
+    value_inference_guide: str = "",
+    intent_type: Optional[str] = None
 ) -> str:
-    """Builds the LLM prompt based on query complexity."""
+    """Builds the LLM prompt based on query complexity and detected intent."""
     
     # Complexity-specific instructions
     complexity_instructions = {
@@ -120,29 +242,30 @@ For this multi-step query:
         complexity_instructions["moderate"]
     )
     
+    intent_patterns = _intent_patterns(intent_type)
+    
     retry_section = ""
     if retry_context:
         retry_section = f"""
-═══════════════════════════════════════════════════════════════════
-                     PREVIOUS ATTEMPT (FAILED)
-═══════════════════════════════════════════════════════════════════
+{_H['previous']}
 {retry_context}
 
 IMPORTANT: Avoid the same mistakes. Use a different approach.
 """
 
+    # Ordered from most to least stable (fixed rules, session schema, per-question
+    # plan, retry feedback, question) so provider-side prompt caching can reuse
+    # the longest possible prefix across questions and retries. The intent
+    # patterns split that prefix into one variant per confident intent.
     return f"""You are a reasoning-first Natural Language to SQL expert.
 
 Your primary goal is NOT to generate SQL immediately.
 Your goal is to FIRST understand the user's intent and constraints,
 then generate a safe, correct, OPTIMIZED, read-only SQL query.
 
-═══════════════════════════════════════════════════════════════════
-                        MANDATORY 5-STEP PIPELINE
-═══════════════════════════════════════════════════════════════════
+{_H['pipeline']}
 
 STEP 1: INTENT CLASSIFICATION (Already done - see QUERY PLAN below)
-Intent Type: {plan_text}
 
 STEP 2: REASONING PLAN (YOU MUST DO THIS FIRST - VISIBLE TO USER)
 Before writing SQL, produce a short reasoning plan that explains:
@@ -155,36 +278,10 @@ Before writing SQL, produce a short reasoning plan that explains:
 STEP 3: SQL GENERATION (OPTIMIZED - BEST VERSION)
 Generate the BEST POSSIBLE query following these rules:
 
-═══════════════════════════════════════════════════════════════════
-                         OPTIMIZATION RULES
-═══════════════════════════════════════════════════════════════════
+{_H['optimization']}
 
 INTENT-BASED PATTERN SELECTION:
-✅ EXISTENTIAL ("has", "with", "containing"):
-   - Use EXISTS instead of JOIN when only checking existence
-   - EXISTS stops at first match (faster than JOIN)
-   - Example: SELECT c.* FROM Customer c WHERE EXISTS (SELECT 1 FROM Invoice i WHERE i.CustomerId = c.CustomerId)
-
-✅ UNIVERSAL ("only", "every", "all"):
-   - Use NOT EXISTS for anti-joins (most efficient)
-   - Example: Customers who only bought Rock → use NOT EXISTS to exclude other genres
-
-✅ SET_INTERSECTION ("both X and Y"):
-   - Use GROUP BY + HAVING COUNT(DISTINCT ...) = N (single pass)
-   - Avoid multiple subqueries
-   - Example: GROUP BY customer HAVING COUNT(DISTINCT genre) = 2
-
-✅ ABSENCE ("never", "without", "no"):
-   - Use NOT EXISTS or LEFT JOIN + IS NULL  
-   - NOT EXISTS is usually faster
-   - Example: SELECT c.* FROM Customer c WHERE NOT EXISTS (SELECT 1 FROM Invoice i WHERE i.CustomerId = c.CustomerId)
-
-✅ AGGREGATION/RANKING ("top", "most", "average"):
-   - Use ORDER BY + LIMIT (no DISTINCT RANK needed)
-   - Apply LIMIT to cap results
-   - Example: ORDER BY total DESC LIMIT 5
-
-PERFORMANCE OPTIMIZATIONS:
+{intent_patterns}PERFORMANCE OPTIMIZATIONS:
 1. ❌ NEVER use SELECT *
 2. ✅ Select only needed columns by name
 3. ✅ Use EXISTS over IN for subqueries
@@ -194,9 +291,7 @@ PERFORMANCE OPTIMIZATIONS:
 7. ✅ Use LIMIT for ranking queries
 8. ✅ Use CTEs (WITH clause) for complex multi-step queries (readability)
 
-═══════════════════════════════════════════════════════════════════
-                   SCHEMA-AWARE VALUE INFERENCE
-═══════════════════════════════════════════════════════════════════
+{_H['inference']}
 
 When using semantic flags (discontinued, active, status, shipped, etc.):
 
@@ -213,11 +308,7 @@ When using semantic flags (discontinued, active, status, shipped, etc.):
       - TEXT → Status values (inspect schema/context)
    3. Explain your inference in REASONING
 
-{value_inference_guide}
-
-═══════════════════════════════════════════════════════════════════
-                         CRITICAL SQL RULES
-═══════════════════════════════════════════════════════════════════
+{_H['rules']}
 
 1. OUTPUT FORMAT (MANDATORY):
    You MUST provide your response in EXACTLY this format:
@@ -247,26 +338,17 @@ When using semantic flags (discontinued, active, status, shipped, etc.):
    - Qualify all column names in JOINs (c.CustomerId, not CustomerId)
    - For complex queries, use CTEs (WITH clause) for clarity
 
-{complexity_guide}
-{retry_section}
-═══════════════════════════════════════════════════════════════════
-                        DATABASE SCHEMA
-═══════════════════════════════════════════════════════════════════
+{_H['schema']}
 {schema_text}
-
-═══════════════════════════════════════════════════════════════════
-                         QUERY PLAN
-═══════════════════════════════════════════════════════════════════
+{value_inference_guide}
+{complexity_guide}
+{_H['plan']}
 {plan_text}
-
-═══════════════════════════════════════════════════════════════════
-                       USER QUESTION
-═══════════════════════════════════════════════════════════════════
+{retry_section}
+{_H['question']}
 {question}
 
-═══════════════════════════════════════════════════════════════════
-                       YOUR RESPONSE
-═══════════════════════════════════════════════════════════════════
+{_H['response']}
 REASONING:
 """
 
@@ -403,44 +485,68 @@ def infer_semantic_flag_values(schema: Dict, question: str) -> str:
     return "\n".join(lines)
 
 
-def format_schema_for_prompt(schema: Dict) -> str:
-    """Formats schema dictionary into a readable string for the LLM."""
+def format_schema_for_prompt(schema: Dict, blocks=None) -> str:
+    """
+    Formats schema dictionary into a readable string for the LLM.
     
-    lines = []
+    Args:
+        schema: Refined database schema
+        blocks: Optional per-session cache (get/set, e.g. TTLCache) of
+            rendered tables keyed by (table, columns), so tables that keep
+            coming back in follow-up questions are rendered once
+    """
+    
+    rendered = []
     for table, info in schema.items():
-        columns = info.get("columns", [])
-        column_types = info.get("column_types", {})
-        primary_keys = info.get("primary_key", [])
-        fks = info.get("foreign_keys", [])
-        
-        # Table header
-        lines.append(f"Table: {table}")
-        
-        # Columns with types
-        col_parts = []
-        for col in columns:
-            col_type = column_types.get(col, "")
-            pk_marker = " [PK]" if col in primary_keys else ""
-            if col_type:
-                col_parts.append(f"{col} ({col_type}){pk_marker}")
-            else:
-                col_parts.append(f"{col}{pk_marker}")
-        
-        lines.append(f"  Columns: {', '.join(col_parts)}")
+        if blocks is None:
+            rendered.append(render_table_block(table, info))
+            continue
         
-        # Foreign keys
-        if fks:
-            fk_strs = []
-            for fk in fks:
-                if isinstance(fk, dict):
-                    fk_strs.append(
-                        f"{fk.get('from', '?')} → {fk.get('to_table', '?')}.{fk.get('to_column', '?')}"
-                    )
-            if fk_strs:
-                lines.append(f"  Foreign Keys: {', '.join(fk_strs)}")
-        
-        lines.append("")
+        key = (table, tuple(info.get("columns", [])))
+        block = blocks.get(key)
+        if block is None:
+            block = render_table_block(table, info)
+            blocks.set(key, block)
+        rendered.append(block)
+    
+    return "\n".join(rendered)
+
+
+def render_table_block(table: str, info: Dict) -> str:
+    """Renders one table (header, typed columns, foreign keys) for the prompt."""
+    
+    columns = info.get("columns", [])
+    column_types = info.get("column_types", {})
+    primary_keys = info.get("primary_key", [])
+    fks = info.get("foreign_keys", [])
+    
+    # Table header
+    lines = [f"Table: {table}"]
+    
+    # Columns with types
+    col_parts = []
+    for col in columns:
+        col_type = column_types.get(col, "")
+        pk_marker = " [PK]" if col in primary_keys else ""
+        if col_type:
+            col_parts.append(f"{col} ({col_type}){pk_marker}")
+        else:
+            col_parts.append(f"{col}{pk_marker}")
     
+    lines.append(f"  Columns: {', '.join(col_parts)}")
+    
+    # Foreign keys
+    if fks:
+        fk_strs = []
+        for fk in fks:
+            if isinstance(fk, dict):
+                fk_strs.append(
+                    f"{fk.get('from', '?')} → {fk.get('to_table', '?')}.{fk.get('to_column', '?')}"
+                )
+        if fk_strs:
+            lines.append(f"  Foreign Keys: {', '.join(fk_strs)}")
+    
+    lines.append("")
     return "\n".join(lines)
 
 
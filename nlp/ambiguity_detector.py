@@ -158,6 +158,13 @@ CLEAR_CONTEXT_PATTERNS = [
     r"average of \w+",    # "average of prices" is clear
 ]
 
+# Compiled once at import; detect_ambiguity runs on every question
+_CLEAR_CONTEXT_RE = re.compile("|".join(CLEAR_CONTEXT_PATTERNS))
+_TERM_RES = [
+    (term, config, re.compile(rf'\b{term}\b'))
+    for term, config in AMBIGUOUS_PATTERNS.items()
+]
+
 
 def detect_ambiguity(query: str) -> Tuple[bool, Optional[Dict]]:
     """
@@ -190,20 +197,18 @@ def detect_ambiguity(query: str) -> Tuple[bool, Optional[Dict]]:
     query_lower = actual_query.lower()
     
     # Check if context makes the query clear
-    for pattern in CLEAR_CONTEXT_PATTERNS:
-        if re.search(pattern, query_lower):
-            # Extract what follows to see if it's actually clear
-            # For now, we'll consider these patterns as clear
-            return False, None
+    if _CLEAR_CONTEXT_RE.search(query_lower):
+        # Extract what follows to see if it's actually clear
+        # For now, we'll consider these patterns as clear
+        return False, None
     
     # Check for ambiguous terms (prioritize high-priority terms)
     high_priority_terms = []
     normal_priority_terms = []
     
-    for term, config in AMBIGUOUS_PATTERNS.items():
+    for term, config, pattern in _TERM_RES:
         # Word boundary check to avoid partial matches
-        pattern = rf'\b{term}\b'
-        if re.search(pattern, query_lower):
+        if pattern.search(query_lower):
             if config.get("priority") == "high":
                 high_priority_terms.append((term, config))
             else:
@@ -8,6 +8,9 @@ Uses LLM to classify user questions into:
 
 from typing import Dict, Tuple
 
+from llm.cache import cached_generate
+from nlp.fast_classifier import fast_classify
+
 def classify_intent(llm_client, question: str) -> Tuple[str, str]:
     """
     Classifies the user's question intent.
@@ -17,20 +20,10 @@ def classify_intent(llm_client, question: str) -> Tuple[str, str]:
         intent_type: 'SQL_QUERY' or 'GENERAL_CHAT'
     """
     
-    # Fast regex checks for obvious non-SQL
-    q = question.lower().strip()
-    
-    # Greetings
-    if q in ["hi", "hello", "hey", "greetings", "good morning", "good evening"]:
-        return "GENERAL_CHAT", "Detected greeting"
-    
-    # Help/Capabilities
-    if any(x in q for x in ["what can you do", "help me", "how to use", "capabilities"]):
-        return "GENERAL_CHAT", "Detected help request"
-    
-    # Summarization requests
-    if any(x in q for x in ["what is this dataset", "explain this database", "summary of data", "tell me about the data"]):
-        return "GENERAL_CHAT", "Detected dataset summary request"
+    # Obvious cases are settled locally without an LLM round-trip
+    fast = fast_classify(question)
+    if fast is not None:
+        return fast
 
     # LLM Classification for nuanced cases
     prompt = f"""You are an intent classifier for a SQL Assistant.
@@ -49,7 +42,7 @@ One word: SQL_QUERY or GENERAL_CHAT
 """
 
     try:
-        response = llm_client.generate(prompt, temperature=0.1, max_tokens=10)
+        response = cached_generate(llm_client, prompt, "classify_intent", temperature=0.1, max_tokens=10)
         intent = response.strip().upper()
         
         if "SQL" in intent:
@@ -0,0 +1,54 @@
+"""
+Fast Intent Classifier
+
+Rule-based first pass for classify_intent. Obvious data questions
+("show top 10...", "how many...") and obvious chat ("hi", "thanks") are
+labelled locally; anything that matches both sides or neither is left to
+the LLM.
+"""
+
+import re
+from typing import Optional, Tuple
+
+
+# Words that almost always mean "query the database"
+_SQL_SIGNALS = re.compile(
+    r"\b(show|list|count|sum|total|avg|average|top|bottom|how many|how much|"
+    r"group by|order by|highest|lowest|maximum|minimum|max|min|per|each|"
+    r"compare|trend|find|which|display|give me|get)\b"
+)
+
+# Whole-message greetings / acknowledgements
+_CHAT_SIGNALS = re.compile(
+    r"^(hi|hello|hey|greetings|good (morning|afternoon|evening)|thanks|"
+    r"thank you|thx|ok|okay|cool|great|bye|goodbye)\b[\s!.?]*$"
+)
+
+# Help and dataset-overview requests
+_CHAT_PHRASES = re.compile(
+    r"what can you do|help me|how to use|capabilities|what is this dataset|"
+    r"explain this database|summary of data|tell me about the data"
+)
+
+
+def fast_classify(question: str) -> Optional[Tuple[str, str]]:
+    """
+    Classifies the question without the LLM when the signal is unambiguous.
+
+    Returns:
+        (intent_type, reasoning), or None when the LLM should decide
+    """
+    q = question.lower().strip()
+
+    if _CHAT_SIGNALS.match(q):
+        return "GENERAL_CHAT", "Detected greeting"
+
+    is_chat = _CHAT_PHRASES.search(q) is not None
+    is_sql = _SQL_SIGNALS.search(q) is not None
+
+    if is_chat and not is_sql:
+        return "GENERAL_CHAT", "Detected help or dataset summary request"
+    if is_sql and not is_chat:
+        return "SQL_QUERY", "Detected data-retrieval keywords"
+
+    return None
@@ -11,6 +11,73 @@ import re
 from typing import Optional, Dict, Tuple, List
 
 
+# Patterns are compiled once at import; detect_meta_query runs on every question.
+# Each category is one alternation so it is matched in a single search.
+
+# Every pattern below contains one of these words. Questions without any of
+# them (most data questions) are rejected after a single scan.
+_META_HINT_RE = re.compile(
+    r"table|schema|describe|structure|column|field|database|relationship|"
+    r"foreign key|links between"
+)
+
+# List all tables
+_LIST_TABLES_RE = re.compile("|".join((
+    r"what tables",
+    r"which tables",
+    r"list.*tables",
+    r"show.*tables",
+    r"all tables",
+    r"tables in.*database",
+    r"database tables",
+    r"available tables",
+)))
+
+# Describe specific table
+_DESCRIBE_PATTERNS = [re.compile(p) for p in (
+    r"schema of (?:the )?(\w+)",
+    r"describe (?:the )?(\w+)",
+    r"structure of (?:the )?(\w+)",
+    r"columns in (?:the )?(\w+)",
+    r"what.*in (?:the )?(\w+) table",
+    r"(\w+) table schema",
+    r"(\w+) table structure",
+    r"show (?:me )?(?:the )?(\w+) table",
+    r"what does (?:the )?(\w+) table contain",
+    r"fields in (?:the )?(\w+)",
+)]
+
+# Table with most rows
+_MOST_ROWS_RE = re.compile("|".join((
+    r"which table.*most rows",
+    r"largest table",
+    r"biggest table",
+    r"table.*most records",
+    r"table.*most data",
+    r"most populated table",
+)))
+
+# Describe all / full schema
+_FULL_SCHEMA_RE = re.compile("|".join((
+    r"full schema",
+    r"entire schema",
+    r"complete schema",
+    r"all columns",
+    r"database structure",
+    r"schema overview",
+    r"describe.*database",
+)))
+
+# Relationships
+_RELATIONSHIP_RE = re.compile("|".join((
+    r"relationships",
+    r"foreign keys",
+    r"how.*tables.*connected",
+    r"table connections",
+    r"links between",
+)))
+
+
 def detect_meta_query(question: str) -> Tuple[bool, Optional[str], Optional[str]]:
     """
     Detects if a question is a meta-query about the database structure.
@@ -25,38 +92,16 @@ def detect_meta_query(question: str) -> Tuple[bool, Optional[str], Optional[str]
     
     q = question.lower().strip()
     
+    if not _META_HINT_RE.search(q):
+        return False, None, None
+    
     # Pattern 1: List all tables
-    list_tables_patterns = [
-        r"what tables",
-        r"which tables",
-        r"list.*tables",
-        r"show.*tables",
-        r"all tables",
-        r"tables in.*database",
-        r"database tables",
-        r"available tables",
-    ]
-    
-    for pattern in list_tables_patterns:
-        if re.search(pattern, q):
-            return True, "list_tables", None
+    if _LIST_TABLES_RE.search(q):
+        return True, "list_tables", None
     
     # Pattern 2: Describe specific table
-    describe_patterns = [
-        r"schema of (?:the )?(\w+)",
-        r"describe (?:the )?(\w+)",
-        r"structure of (?:the )?(\w+)",
-        r"columns in (?:the )?(\w+)",
-        r"what.*in (?:the )?(\w+) table",
-        r"(\w+) table schema",
-        r"(\w+) table structure",
-        r"show (?:me )?(?:the )?(\w+) table",
-        r"what does (?:the )?(\w+) table contain",
-        r"fields in (?:the )?(\w+)",
-    ]
-    
-    for pattern in describe_patterns:
-        match = re.search(pattern, q)
+    for pattern in _DESCRIBE_PATTERNS:
+        match = pattern.search(q)
         if match:
             table_name = match.group(1)
             # Filter out common words that aren't table names
@@ -64,46 +109,16 @@ def detect_meta_query(question: str) -> Tuple[bool, Optional[str], Optional[str]
                 return True, "describe_table", table_name
     
     # Pattern 3: Table with most rows
-    most_rows_patterns = [
-        r"which table.*most rows",
-        r"largest table",
-        r"biggest table",
-        r"table.*most records",
-        r"table.*most data",
-        r"most populated table",
-    ]
-    
-    for pattern in most_rows_patterns:
-        if re.search(pattern, q):
-            return True, "table_rows", None
+    if _MOST_ROWS_RE.search(q):
+        return True, "table_rows", None
     
     # Pattern 4: Describe all / full schema
-    full_schema_patterns = [
-        r"full schema",
-        r"entire schema",
-        r"complete schema",
-        r"all columns",
-        r"database structure",
-        r"schema overview",
-        r"describe.*database",
-    ]
-    
-    for pattern in full_schema_patterns:
-        if re.search(pattern, q):
-            return True, "describe_all", None
+    if _FULL_SCHEMA_RE.search(q):
+        return True, "describe_all", None
     
     # Pattern 5: Relationships
-    relationship_patterns = [
-        r"relationships",
-        r"foreign keys",
-        r"how.*tables.*connected",
-        r"table connections",
-        r"links between",
-    ]
-    
-    for pattern in relationship_patterns:
-        if re.search(pattern, q):
-            return True, "relationships", None
+    if _RELATIONSHIP_RE.search(q):
+        return True, "relationships", None
     
     return False, None, None
 
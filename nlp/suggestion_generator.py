@@ -6,13 +6,49 @@ Uses LLM to analyze database schema and user context to generate:
 2. "Related" or "Refined" follow-up questions after a query.
 """
 
+import re
+import json
 from typing import List, Dict
 
-def generate_initial_questions(llm_client, schema: Dict) -> List[str]:
+from llm.cache import acached_generate, cached_generate
+
+def generate_upload_insights(llm_client, schema: Dict) -> Dict:
     """
-    Analyzes the schema to generate 4 diverse starting questions.
+    Produces everything the upload step needs from the LLM in ONE request:
+    a short dataset summary, 4 starter questions and a few warm follow-up examples.
+
+    Returns:
+        dict: {"summary": str, "initial_questions": list[str], "warm_examples": list[str]}
+    """
+    
+    prompt = _upload_insights_prompt(schema)
+
+    try:
+        # Same schema -> same prompt, so re-uploads of a DB are answered from cache
+        response = cached_generate(llm_client, prompt, "upload_insights", temperature=0.7, ttl=None)
+        return _parse_upload_insights(response)
+    except:
+        # Fallback if LLM fails
+        return _fallback_upload_insights(schema)
+
+
+async def agenerate_upload_insights(llm_client, schema: Dict) -> Dict:
+    """
+    Async version of generate_upload_insights, using `llm_client.agenerate`.
+    Cancelling it (e.g. on timeout) cancels the in-flight LLM request.
     """
     
+    prompt = _upload_insights_prompt(schema)
+
+    try:
+        # Same schema -> same prompt, so re-uploads of a DB are answered from cache
+        response = await acached_generate(llm_client, prompt, "upload_insights", temperature=0.7, ttl=None)
+        return _parse_upload_insights(response)
+    except Exception:
+        return _fallback_upload_insights(schema)
+
+
+def _upload_insights_prompt(schema: Dict) -> str:
     # Create a compact schema summary
     tables = list(schema.keys())
     schema_summary = f"Tables: {', '.join(tables)}\n"
@@ -21,36 +57,67 @@ def generate_initial_questions(llm_client, schema: Dict) -> List[str]:
         cols = schema[t].get("columns", [])
         schema_summary += f"- {t}: {', '.join(cols[:5])}...\n"
 
-    prompt = f"""You are a SQL expert. Analyze this database schema and generate 4 diverse, interesting questions a user might want to ask.
+    return f"""You are a SQL expert. Analyze this database schema.
     
 SCHEMA:
 {schema_summary}
 
-RULES:
-1. Generate natural language questions (no SQL).
-2. Covering different complexity levels:
-   - 1 Simple (Count/List)
-   - 1 Moderate (Group By/Top N)
-   - 1 Complex (Join/Filter)
-   - 1 Business Insight (Trends/Performance)
-3. Keep them concise (under 15 words).
-4. Return ONLY the 4 questions, one per line.
-
-QUESTIONS:
+TASKS:
+1. "summary": one or two sentences describing what this dataset is about.
+2. "initial_questions": generate 4 diverse, interesting questions a user might want to ask.
+   - Natural language questions (no SQL).
+   - Covering different complexity levels:
+     - 1 Simple (Count/List)
+     - 1 Moderate (Group By/Top N)
+     - 1 Complex (Join/Filter)
+     - 1 Business Insight (Trends/Performance)
+   - Keep them concise (under 15 words).
+3. "warm_examples": 3 common follow-up questions a user is likely to ask next.
+
+RESPONSE FORMAT:
+Return ONLY a JSON object, no markdown:
+{{"summary": "...", "initial_questions": ["...", "...", "...", "..."], "warm_examples": ["...", "...", "..."]}}
 """
 
-    try:
-        response = llm_client.generate(prompt, temperature=0.7)
-        questions = [q.strip("- ").strip() for q in response.strip().split("\n") if q.strip()]
-        return questions[:4]
-    except:
-        # Fallback if LLM fails
-        return [
+
+def _fallback_upload_insights(schema: Dict) -> Dict:
+    tables = list(schema.keys())
+    return {
+        "summary": "",
+        "initial_questions": [
             f"Show me the first 10 {tables[0]}",
             f"How many {tables[0]} are there?",
             f"List all {tables[1] if len(tables) > 1 else tables[0]}",
             "What tables are in this database?"
-        ]
+        ],
+        "warm_examples": []
+    }
+
+
+def _parse_upload_insights(response: str) -> Dict:
+    """Parses the JSON object returned for generate_upload_insights."""
+    
+    match = re.search(r"\{.*\}", response, re.DOTALL)
+    if not match:
+        raise ValueError("No JSON object in upload insights response")
+    
+    data = json.loads(match.group(0))
+    questions = [str(q).strip() for q in data.get("initial_questions", []) if str(q).strip()]
+    if not questions:
+        raise ValueError("No initial questions in upload insights response")
+    
+    return {
+        "summary": str(data.get("summary", "")).strip(),
+        "initial_questions": questions[:4],
+        "warm_examples": [str(q).strip() for q in data.get("warm_examples", []) if str(q).strip()][:3]
+    }
+
+
+def generate_initial_questions(llm_client, schema: Dict) -> List[str]:
+    """
+    Analyzes the schema to generate 4 diverse starting questions.
+    """
+    return generate_upload_insights(llm_client, schema)["initial_questions"]
 
 
 def generate_related_questions(
@@ -77,7 +144,7 @@ SUGGESTIONS:
 """
 
     try:
-        response = llm_client.generate(prompt, temperature=0.6)
+        response = cached_generate(llm_client, prompt, "related_questions", temperature=0.6)
         questions = [q.strip("- ").strip() for q in response.strip().split("\n") if q.strip()]
         return questions[:3]
     except:
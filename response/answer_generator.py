@@ -9,7 +9,7 @@ Generates human-readable final answers by analyzing:
 This provides intelligent, context-aware responses.
 """
 
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Iterator
 
 
 def generate_final_answer(
@@ -35,10 +35,78 @@ def generate_final_answer(
         str: Natural language answer
     """
     
+    prompt = _build_answer_prompt(question, sql, columns, rows, row_count)
+    
+    try:
+        answer = llm_client.generate(prompt, temperature=0.3)
+        return answer.strip()
+    except Exception as e:
+        # Fallback to basic interpretation
+        return _generate_fallback_answer(question, columns, rows, row_count)
+
+
+async def agenerate_final_answer(
+    llm_client,
+    question: str,
+    sql: str,
+    columns: List[str],
+    rows: List[List[Any]],
+    row_count: int
+) -> str:
+    """
+    Async version of generate_final_answer, using `llm_client.agenerate`.
+    """
+    
+    prompt = _build_answer_prompt(question, sql, columns, rows, row_count)
+    
+    try:
+        answer = await llm_client.agenerate(prompt, temperature=0.3)
+        return answer.strip()
+    except Exception as e:
+        # Fallback to basic interpretation
+        return _generate_fallback_answer(question, columns, rows, row_count)
+
+
+def stream_final_answer(
+    llm_client,
+    question: str,
+    sql: str,
+    columns: List[str],
+    rows: List[List[Any]],
+    row_count: int
+) -> Iterator[str]:
+    """
+    Streaming variant of generate_final_answer: yields the answer in chunks
+    as the LLM produces them.
+    """
+    
+    prompt = _build_answer_prompt(question, sql, columns, rows, row_count)
+    
+    streamed = False
+    try:
+        for chunk in llm_client.stream(prompt, temperature=0.3):
+            streamed = True
+            yield chunk
+    except Exception as e:
+        if streamed:
+            raise
+        # Fallback to basic interpretation
+        yield _generate_fallback_answer(question, columns, rows, row_count)
+
+
+def _build_answer_prompt(
+    question: str,
+    sql: str,
+    columns: List[str],
+    rows: List[List[Any]],
+    row_count: int
+) -> str:
+    """Builds the answer-generation prompt."""
+    
     # Format results for LLM
     results_text = _format_results_for_llm(columns, rows, row_count)
     
-    prompt = f"""You are a helpful data analyst. Based on the user's question and the query results, provide a clear, natural language answer.
+    return f"""You are a helpful data analyst. Based on the user's question and the query results, provide a clear, natural language answer.
 
 USER QUESTION:
 {question}
@@ -62,13 +130,6 @@ INSTRUCTIONS:
 8. If listing items, mention the top few and total count
 
 YOUR ANSWER:"""
-    
-    try:
-        answer = llm_client.generate(prompt, temperature=0.3)
-        return answer.strip()
-    except Exception as e:
-        # Fallback to basic interpretation
-        return _generate_fallback_answer(question, columns, rows, row_count)
 
 
 def _format_results_for_llm(
@@ -5,6 +5,7 @@ Converts SQL execution results to natural language.
 Generates human-readable explanations with context-aware messaging.
 """
 
+import re
 from typing import Dict, List, Any, Optional
 
 
@@ -98,22 +99,28 @@ def interpret(result: Dict, question: str = "", max_preview_rows: int = 100) ->
     }
 
 
+# Phrase groups for _generate_empty_answer, checked in this order
+_NEGATION_RE = re.compile(r"never|without|haven't|hasn't|no ")
+_EXISTENCE_RE = re.compile(r"are there|is there|does|do any|exist")
+_WH_QUESTION_RE = re.compile(r"who|which|what")
+
+
 def _generate_empty_answer(question: str, columns: List[str]) -> str:
     """Generates a meaningful message for empty results."""
     
     q = question.lower()
     
     # Questions about non-existence
-    if any(phrase in q for phrase in ["never", "without", "haven't", "haven't", "hasn't", "no "]):
+    if _NEGATION_RE.search(q):
         return ("**No matching records found.** This means all records in the database "
                 "satisfy the opposite condition of what you asked about.")
     
     # Questions about existence
-    if any(phrase in q for phrase in ["are there", "is there", "does", "do any", "exist"]):
+    if _EXISTENCE_RE.search(q):
         return "**No** - there are no records matching your criteria in the database."
     
     # Who/which questions
-    if any(phrase in q for phrase in ["who", "which", "what"]):
+    if _WH_QUESTION_RE.search(q):
         return ("**No records found** matching your criteria. "
                 "The data you're looking for may not exist in the database.")
     
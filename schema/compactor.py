@@ -0,0 +1,93 @@
+"""
+Schema Compactor
+
+Trims a refined schema down to the columns a question is likely to need
+before it is formatted into the SQL-generation prompt. Wide tables are
+the main source of prompt tokens, so each table keeps its key columns,
+the columns whose name shares a word with the question, and then the
+remaining columns in declaration order up to a per-table cap.
+
+Tables the question names are never trimmed: a filter value such as
+"customers in Berlin" needs a column (city) that shares no word with the
+question. A wrongly dropped column is not recovered later - the SQL it
+produces usually still runs, so no retry is triggered - hence trimming
+only touches tables the question reaches indirectly (FK neighbours).
+"""
+
+import re
+from functools import lru_cache
+from typing import Dict, FrozenSet, List
+
+
+MAX_COLS_PER_TABLE = 8
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+@lru_cache(maxsize=4096)
+def _name_tokens(name: str) -> FrozenSet[str]:
+    """Splits `OrderDate` / `order_date` into {"order", "date"}."""
+    return frozenset(_WORD_RE.findall(_CAMEL_RE.sub(" ", name).lower()))
+
+
+def _query_tokens(query: str) -> FrozenSet[str]:
+    tokens = set()
+    for word in _WORD_RE.findall(query.lower()):
+        tokens.add(word)
+        # Cheap plural folding so "prices" matches "price"
+        if len(word) > 3 and word.endswith("s"):
+            tokens.add(word[:-1])
+    return frozenset(tokens)
+
+
+def compact_schema(
+    refined_schema: Dict,
+    query: str,
+    max_cols_per_table: int = MAX_COLS_PER_TABLE
+) -> Dict:
+    """
+    Returns a copy of `refined_schema` with at most `max_cols_per_table`
+    columns per table.
+
+    Primary keys and foreign-key columns are always kept so joins stay
+    expressible, even if that exceeds the cap. Tables already within the
+    cap, and tables whose name appears in `query`, are returned unchanged.
+
+    Args:
+        refined_schema: Output of refine_schema
+        query: User question the schema is being trimmed for, with its
+            conversation context so columns named in earlier turns count
+        max_cols_per_table: Column budget per table
+
+    Returns:
+        dict: Compacted schema with the same structure
+    """
+
+    q_tokens = _query_tokens(query)
+    compacted = {}
+
+    for table, info in refined_schema.items():
+        columns = info.get("columns", [])
+        if len(columns) <= max_cols_per_table or _name_tokens(table) & q_tokens:
+            compacted[table] = info
+            continue
+
+        keys = set(info.get("primary_key", []))
+        keys.update(
+            fk.get("from") for fk in info.get("foreign_keys", []) if isinstance(fk, dict)
+        )
+
+        matched = [c for c in columns if c not in keys and _name_tokens(c) & q_tokens]
+        rest = [c for c in columns if c not in keys and c not in matched]
+
+        kept: List[str] = [c for c in columns if c in keys]
+        budget = max(max_cols_per_table - len(kept), 0)
+        kept_set = set(kept) | set((matched + rest)[:budget])
+
+        compacted[table] = {
+            **info,
+            "columns": [c for c in columns if c in kept_set]
+        }
+
+    return compacted
@@ -1,4 +1,8 @@
 from schema.fk_graph import FKGraph
+from utils.cache import TTLCache
+
+
+TRANSACTIONAL_KEYWORDS = {"top", "most", "highest", "lowest", "sale", "sales", "order", "purchase", "revenue", "spending"}
 
 
 def refine_schema(
@@ -46,8 +50,7 @@ def refine_schema(
         seed_tables = [t for t, _ in table_scores[:top_k]]
     
     # NEW: Transactional awareness
-    transactional_keywords = {"top", "most", "highest", "lowest", "sale", "sales", "order", "purchase", "revenue", "spending"}
-    if any(k in keywords for k in transactional_keywords):
+    if any(k in keywords for k in TRANSACTIONAL_KEYWORDS):
         # Look for tables that likely contain transactional data but weren't picked
         transactional_tables = {"orders", "order_details", "invoices", "invoice_items", "sales", "transactions", "order details"}
         for table in full_schema.keys():
@@ -64,10 +67,12 @@ def refine_schema(
     fk_graph = FKGraph(full_schema)
     expanded_tables = fk_graph.expand_tables(seed_tables, hops=fk_hops)
 
-    # Column pruning: keep only relevant columns
+    # Column pruning: keep only relevant columns. Tables are emitted in
+    # schema order (not set order) so the same question renders the same prompt
     refined_schema = {}
-    for table in expanded_tables:
-        info = full_schema[table]
+    for table, info in full_schema.items():
+        if table not in expanded_tables:
+            continue
         cols = info.get("columns", [])
 
         relevant_cols = [
@@ -85,3 +90,34 @@ def refine_schema(
         }
 
     return refined_schema
+
+
+class SchemaRefiner:
+    """
+    Per-session memo for refine_schema.
+
+    The refined schema only depends on which table names, column names and
+    transactional keywords appear in the question, so the cache key is the
+    set of those tokens. Follow-ups that touch the same tables reuse the
+    earlier result instead of rescoring the whole schema.
+    """
+
+    def __init__(self, full_schema: dict, maxsize: int = 256):
+        self.full_schema = full_schema
+        self._cache = TTLCache(maxsize=maxsize)
+
+        vocabulary = set(TRANSACTIONAL_KEYWORDS)
+        for table, info in full_schema.items():
+            vocabulary.add(table.lower())
+            vocabulary.update(col.lower() for col in info.get("columns", []))
+        self._vocabulary = frozenset(vocabulary)
+
+    def refine(self, user_query: str, top_k: int = 3, fk_hops: int = 1) -> dict:
+        tokens = self._vocabulary.intersection(user_query.lower().split())
+        key = (tokens, top_k, fk_hops)
+
+        refined = self._cache.get(key)
+        if refined is None:
+            refined = refine_schema(self.full_schema, user_query, top_k, fk_hops)
+            self._cache.set(key, refined)
+        return refined
@@ -0,0 +1,158 @@
+"""
+Redis-backed session registry, for running several API workers.
+
+Each worker keeps live Session objects (connection pool, caches) in its
+local SessionStore; Redis holds what is needed to rebuild one - the
+database path, the extracted schema and the warm state - so a request can
+be served by a worker other than the one that handled the upload. The
+uploaded database files must be on storage every worker can read.
+
+The conversation (chat history and any pending clarification) lives in
+Redis too, under its own key: each question runs under a Redis lock, loads
+that state first and publishes it when done, so a follow-up or a
+clarification reply gets the same context whichever worker answers it.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import List, Optional, Tuple
+
+import orjson
+import redis
+import redis.asyncio
+
+from session.session_manager import Session
+from session.store import SessionStore, remove_db_file
+
+
+# Longest one question may hold a session's Redis lock (seconds); the lock
+# expires after this if its worker dies mid-question
+TURN_LOCK_TIMEOUT = 300
+
+
+class RedisSessionStore(SessionStore):
+    """
+    SessionStore whose sessions are registered in Redis under
+    `{prefix}{session_id}` (conversation under `...:state`) with an idle
+    expiry of `idle_ttl` seconds.
+
+    Deleting a session anywhere removes its Redis keys; other workers drop
+    their local copy on next access. The database file is removed once the
+    Redis key is gone, not when one worker evicts its local copy.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        idle_ttl: float = 24 * 3600,
+        shards: int = 16,
+        prefix: str = "nl2sql:session:"
+    ):
+        super().__init__(idle_ttl=idle_ttl, shards=shards)
+        self.redis = redis.Redis.from_url(url)
+        self.aredis = redis.asyncio.Redis.from_url(url)
+        self.prefix = prefix
+
+    def _key(self, session_id: str) -> str:
+        return self.prefix + session_id
+
+    def _state_key(self, session_id: str) -> str:
+        return self.prefix + session_id + ":state"
+
+    def get(self, session_id: str) -> Optional[Session]:
+        ttl = int(self.idle_ttl)
+        session = super().get(session_id)
+
+        if session is not None:
+            # Refreshes the shared expiry; False means it was deleted elsewhere
+            pipe = self.redis.pipeline()
+            pipe.expire(self._key(session_id), ttl)
+            pipe.expire(self._state_key(session_id), ttl)
+            if pipe.execute()[0]:
+                return session
+            super().pop(session_id)
+            session.close()
+            return None
+
+        raw = self.redis.getex(self._key(session_id), ex=ttl)
+        if raw is None:
+            return None
+
+        meta = orjson.loads(raw)
+        if not os.path.exists(meta["db_path"]):
+            return None
+
+        session = Session(db_path=meta["db_path"], schema=meta["schema"])
+        session.warm_state.update(meta.get("warm_state", {}))
+        super().set(session_id, session)
+        return session
+
+    def set(self, session_id: str, session: Session):
+        super().set(session_id, session)
+        self.redis.set(self._key(session_id), _dump(session), ex=int(self.idle_ttl))
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        session = super().pop(session_id)
+        pipe = self.redis.pipeline()
+        pipe.getdel(self._key(session_id))
+        pipe.delete(self._state_key(session_id))
+        raw = pipe.execute()[0]
+
+        if session is None and raw is not None:
+            # Held by another worker; rebuild enough for the caller to remove the file
+            meta = orjson.loads(raw)
+            session = Session(db_path=meta["db_path"], schema=meta["schema"])
+        return session
+
+    # Redis round-trips (and rebuilding a Session) run on a worker thread
+    async def aget(self, session_id: str) -> Optional[Session]:
+        return await asyncio.to_thread(self.get, session_id)
+
+    async def aset(self, session_id: str, session: Session):
+        await asyncio.to_thread(self.set, session_id, session)
+
+    async def apop(self, session_id: str) -> Optional[Session]:
+        return await asyncio.to_thread(self.pop, session_id)
+
+    @asynccontextmanager
+    async def turn(self, session_id: str, session: Session):
+        state_key = self._state_key(session_id)
+        # The local lock keeps this worker's own questions from queueing on Redis
+        async with session.lock:
+            async with self.aredis.lock(self._key(session_id) + ":lock", timeout=TURN_LOCK_TIMEOUT):
+                raw = await self.aredis.get(state_key)
+                if raw is not None:
+                    _load_state(session, orjson.loads(raw))
+                try:
+                    yield
+                finally:
+                    await self.aredis.set(state_key, _dump_state(session), ex=int(self.idle_ttl))
+
+    def _release(self, sessions: List[Tuple[str, Session]]):
+        for session_id, session in sessions:
+            if self.redis.exists(self._key(session_id)):
+                # Still live for other workers (or after a restart)
+                session.close()
+            else:
+                remove_db_file(session)
+
+
+def _dump(session: Session) -> bytes:
+    return orjson.dumps({
+        "db_path": session.db_path,
+        "schema": session.full_schema,
+        "warm_state": session.warm_state
+    })
+
+
+def _dump_state(session: Session) -> bytes:
+    return orjson.dumps({
+        "history": session.memory.get_history(),
+        "clarification_state": session.clarification_state
+    })
+
+
+def _load_state(session: Session, state: dict):
+    session.memory.history = state["history"]
+    session.clarification_state = state["clarification_state"]
@@ -1,4 +1,51 @@
+import asyncio
+import hashlib
+import os
+import re
+import sqlite3
+
 from session.memory import ConversationMemory
+from nlp.context_builder import build_context
+from schema.refiner import SchemaRefiner
+from nlp.planner import create_plan
+from db.executor import execute_sql, SQLExecutionError
+from db.async_executor import execute_sql_async
+from db.pool import get_pool, close_pool
+from llm.self_correction import QueryCorrector
+from utils.cache import TTLCache
+
+
+# Leading request phrasing that does not change what is asked:
+# "Can you show me all customers?" and "list all customers" ask the same
+_FILLER_PREFIX_RE = re.compile(
+    r"^(?:(?:please|can you|could you|would you|show me|show|list|display|give me|get me|tell me)\s+)+"
+)
+
+
+def normalize_question(question: str) -> str:
+    """
+    Key form of a question: lowercase, single spaces, no trailing
+    punctuation and no leading filler such as "please show me".
+    """
+    key = re.sub(r"\s+", " ", question.lower()).strip(" ?.!")
+    return _FILLER_PREFIX_RE.sub("", key) or key
+
+
+# Questions that lean on earlier turns: very short ones ("last 7 days"),
+# ones opening with a continuation ("what about...", "and by city") and
+# ones pointing back at an earlier result ("tell me more", "only those")
+_FOLLOW_UP_MAX_WORDS = 3
+_FOLLOW_UP_RE = re.compile(
+    r"^(?:what about|how about|and|or|but|now|then)\b"
+    r"|\b(?:it|they|them|those|these|same|more|also|instead|else|again|previous|above)\b"
+)
+
+
+def is_follow_up(question: str) -> bool:
+    """True if `question` likely depends on the conversation before it."""
+    if len(question.split()) <= _FOLLOW_UP_MAX_WORDS:
+        return True
+    return bool(_FOLLOW_UP_RE.search(normalize_question(question)))
 
 
 class Session:
@@ -9,6 +56,11 @@ class Session:
     def __init__(self, db_path: str, schema: dict):
         self.db_path = db_path
         self.full_schema = schema
+        self.schema_refiner = SchemaRefiner(schema)
+
+        # Derived once at upload; the schema never changes within a session
+        self.schema_column_map = QueryCorrector.column_map(schema)
+        self.corrector = QueryCorrector(schema, all_columns=self.schema_column_map)
 
         # Managed conversation memory
         self.memory = ConversationMemory(max_turns=10)
@@ -16,6 +68,38 @@ class Session:
         # Holds ambiguity clarification state (if any)
         self.clarification_state = None
 
+        # Serializes questions on this session so concurrent /ask calls
+        # cannot interleave history and clarification updates
+        self.lock = asyncio.Lock()
+
+        # Filled in the background after upload (see /session/{id}/warm)
+        self.warm_state = {
+            "ready": False,
+            "summary": "",
+            "initial_questions": [],
+            "warm_examples": []
+        }
+
+        # Query plans by (question, refined schema); create_plan is pure
+        self.plan_cache = TTLCache(maxsize=256)
+
+        # Prompt text per (table, columns), reused by every SQL-generation call
+        self.schema_blocks = TTLCache(maxsize=1024)
+
+        # Same for the retry prompt's shorter schema listing
+        self.retry_schema_blocks = TTLCache(maxsize=1024)
+
+        # Finished answers by response_cache_key(question), for repeats
+        self.response_cache = TTLCache(maxsize=256, ttl=900)
+
+        # Full results by SQL when they span more than one page, so
+        # /session/{id}/rows can serve later pages without re-running the query
+        self.result_cache = TTLCache(maxsize=16, ttl=900)
+
+        # Read-only connections reused across questions and retries; shared
+        # with upload validation and schema extraction for the same file
+        self.pool = get_pool(db_path, max_size=4)
+
     def add_user_message(self, message: str):
         self.memory.add_user_message(message)
 
@@ -25,5 +109,53 @@ class Session:
     def get_chat_history(self):
         return self.memory.get_history()
 
+    def response_cache_key(self, question: str) -> tuple:
+        """
+        response_cache key for `question` asked now. Stand-alone questions
+        are keyed on their normalized text, so a repeat hits however many
+        turns came in between. Follow-ups (is_follow_up) are answered
+        against the recent conversation, so a digest of that context
+        (build_context) is added: "tell me more" only repeats under the
+        same preceding turns. The database file's mtime keeps answers from
+        outliving a change to the data.
+        """
+        digest = None
+        if is_follow_up(question):
+            context = build_context(self.get_chat_history())
+            digest = hashlib.blake2b(context.encode(), digest_size=16).digest()
+        return (normalize_question(question), digest, os.stat(self.db_path).st_mtime_ns)
+
+    def refine_schema(self, user_query: str) -> dict:
+        return self.schema_refiner.refine(user_query)
+
+    def create_plan(self, user_query: str, refined_schema: dict) -> dict:
+        # create_plan only sees the lowercased question
+        key = (
+            user_query.lower(),
+            tuple((table, tuple(info.get("columns", []))) for table, info in refined_schema.items())
+        )
+        plan = self.plan_cache.get(key)
+        if plan is None:
+            plan = create_plan(user_query, refined_schema)
+            self.plan_cache.set(key, plan)
+        return plan
+
+    def execute_sql(self, sql: str, **kwargs) -> dict:
+        """Runs `execute_sql` on a pooled connection to this session's DB."""
+        try:
+            with self.pool.acquire() as conn:
+                return execute_sql(self.db_path, sql, conn=conn, **kwargs)
+        except sqlite3.Error as e:
+            # Opening a pooled connection failed
+            raise SQLExecutionError(f"Database error: {str(e)}")
+
+    async def aexecute_sql(self, sql: str, **kwargs) -> dict:
+        """Async `execute_sql`, run on the dedicated database threads."""
+        return await execute_sql_async(self.db_path, sql, pool=self.pool, **kwargs)
+
+    def close(self):
+        close_pool(self.db_path)
+        self.pool.close()
+
     def clear_clarification(self):
         self.clarification_state = None
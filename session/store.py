@@ -0,0 +1,128 @@
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from session.session_manager import Session
+
+
+class _Shard:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.sessions: Dict[str, Session] = {}
+        self.last_seen = OrderedDict()  # session_id -> last access, oldest first
+
+
+class SessionStore:
+    """
+    Holds live sessions for this process.
+
+    Sessions are spread over `shards` independently locked buckets so
+    concurrent requests for different sessions do not contend on one lock.
+    Sessions idle for longer than `idle_ttl` seconds are dropped and their
+    uploaded database file is removed, either on access or by `sweep()`.
+    """
+
+    def __init__(self, idle_ttl: float = 24 * 3600, shards: int = 16):
+        self.idle_ttl = idle_ttl
+        self._shards = [_Shard() for _ in range(shards)]
+
+    def _shard(self, session_id: str) -> _Shard:
+        return self._shards[zlib.crc32(session_id.encode()) % len(self._shards)]
+
+    def get(self, session_id: str) -> Optional[Session]:
+        shard = self._shard(session_id)
+        with shard.lock:
+            expired = self._expire(shard)
+            session = shard.sessions.get(session_id)
+            if session is not None:
+                self._touch(shard, session_id)
+        self._release(expired)
+        return session
+
+    def set(self, session_id: str, session: Session):
+        shard = self._shard(session_id)
+        with shard.lock:
+            expired = self._expire(shard)
+            shard.sessions[session_id] = session
+            self._touch(shard, session_id)
+        self._release(expired)
+
+    def pop(self, session_id: str) -> Optional[Session]:
+        shard = self._shard(session_id)
+        with shard.lock:
+            shard.last_seen.pop(session_id, None)
+            return shard.sessions.pop(session_id, None)
+
+    # Async handlers use these; a store backed by a network service
+    # overrides them so lookups do not block the event loop
+    async def aget(self, session_id: str) -> Optional[Session]:
+        return self.get(session_id)
+
+    async def aset(self, session_id: str, session: Session):
+        self.set(session_id, session)
+
+    async def apop(self, session_id: str) -> Optional[Session]:
+        return self.pop(session_id)
+
+    def turn(self, session_id: str, session: Session):
+        """
+        Async context manager held while one question is answered:
+        serializes questions on the session and, for a shared store, loads
+        the conversation state before and publishes it after.
+        """
+        return session.lock
+
+    def sweep(self) -> int:
+        """Drops every expired session; returns how many were removed."""
+        expired = []
+        for shard in self._shards:
+            with shard.lock:
+                expired.extend(self._expire(shard))
+        self._release(expired)
+        return len(expired)
+
+    def clear(self):
+        """Drops every session and removes its database file."""
+        sessions = []
+        for shard in self._shards:
+            with shard.lock:
+                sessions.extend(shard.sessions.items())
+                shard.sessions.clear()
+                shard.last_seen.clear()
+        self._release(sessions)
+
+    def __len__(self) -> int:
+        self.sweep()
+        return sum(len(shard.sessions) for shard in self._shards)
+
+    @staticmethod
+    def _touch(shard: _Shard, session_id: str):
+        shard.last_seen[session_id] = time.monotonic()
+        shard.last_seen.move_to_end(session_id)
+
+    def _expire(self, shard: _Shard) -> List[Tuple[str, Session]]:
+        """Unlinks expired sessions from `shard` (caller holds its lock)."""
+        cutoff = time.monotonic() - self.idle_ttl
+        expired = []
+        while shard.last_seen:
+            session_id, seen = next(iter(shard.last_seen.items()))
+            if seen >= cutoff:
+                break
+            del shard.last_seen[session_id]
+            expired.append((session_id, shard.sessions.pop(session_id)))
+        return expired
+
+    def _release(self, sessions: List[Tuple[str, Session]]):
+        """Disposes of sessions dropped from the store (called outside the shard lock)."""
+        for _, session in sessions:
+            remove_db_file(session)
+
+
+def remove_db_file(session: Session):
+    """Closes the session and deletes its uploaded database, if it still exists."""
+    session.close()
+    if os.path.exists(session.db_path):
+        os.remove(session.db_path)
@@ -0,0 +1,81 @@
+"""
+Test that cached answers are only reused in the same conversation state
+"""
+
+import os
+import sys
+
+import requests
+
+from db.schema_extractor import extract_schema
+from session.session_manager import Session
+
+API_URL = "http://localhost:8000"
+
+db_path = "sample_ecommerce.db"
+if not os.path.exists(db_path):
+    os.system("python create_sample_db.py")
+
+session = Session(db_path=db_path, schema=extract_schema(db_path))
+
+print("=" * 70)
+print("TESTING RESPONSE CACHE KEYS")
+print("=" * 70)
+
+results = []
+
+def check(name, ok):
+    results.append(ok)
+    print(f"{'✅' if ok else '❌'} {name}")
+
+# Filler phrasing maps onto the same key for a stand-alone question
+check(
+    "Leading filler is ignored",
+    session.response_cache_key("Please show me the top 5 products") == session.response_cache_key("the top 5 products")
+)
+
+# A stand-alone question repeats across intervening turns
+standalone = "List all customers with their email"
+key_first = session.response_cache_key(standalone)
+session.add_user_message(standalone)
+session.add_system_message("Here are the customers and their emails.")
+session.add_user_message("Show total revenue by product")
+session.add_system_message("Here is the revenue.")
+check("Stand-alone question keeps its key after other turns", session.response_cache_key(standalone) == key_first)
+
+# Conversation A: answer a follow-up and cache it
+session.add_user_message("List all customers")
+session.add_system_message("Here are the customers.")
+key_a = session.response_cache_key("tell me more")
+session.response_cache.set(key_a, {"answer": "More about customers."})
+
+check("Same follow-up in the same conversation is a hit", session.response_cache.get(session.response_cache_key("tell me more")) is not None)
+
+# Conversation B: same words, different preceding turns
+session.add_user_message("Show total revenue by product")
+session.add_system_message("Here is the revenue.")
+key_b = session.response_cache_key("tell me more")
+
+check("Follow-up after different turns gets a different key", key_a != key_b)
+check("Follow-up after different turns is not served from cache", session.response_cache.get(key_b) is None)
+
+session.close()
+
+# Two real /ask turns with the same question: the second is a cache hit
+print("\nAPI: asking the same question twice")
+try:
+    with open(db_path, "rb") as f:
+        upload = requests.post(f"{API_URL}/upload-db", files={"file": ("sample_ecommerce.db", f)}, timeout=90)
+    session_id = upload.json()["session_id"]
+    answers = [
+        requests.post(f"{API_URL}/ask", json={"session_id": session_id, "question": standalone}, timeout=90).json()
+        for _ in range(2)
+    ]
+    check("First /ask is answered by the pipeline", not answers[0].get("cached"))
+    check("Second /ask is served from cache", answers[1].get("cached") is True)
+except requests.exceptions.ConnectionError:
+    print("⚠️  API not running at", API_URL, "- start it with: uvicorn api:app")
+
+print("\n" + "=" * 70)
+print(f"Passed: {sum(results)}/{len(results)}")
+sys.exit(0 if all(results) else 1)
@@ -13,6 +13,7 @@ import requests
 import pandas as pd
 import json
 import os
+import time
 from datetime import datetime
 from typing import Optional, Dict, List
 import uuid
@@ -23,6 +24,11 @@ import uuid
 API_URL = "http://127.0.0.1:8000"
 CHAT_HISTORY_FILE = "chat_history.json"
 
+# Starter questions are generated in the background after upload; the page
+# re-checks for them this often, at most this many times per session
+WARM_POLL_INTERVAL = 1.0  # seconds
+WARM_POLL_LIMIT = 30
+
 st.set_page_config(
     page_title="Query Potter",
     page_icon="🧠",
@@ -355,6 +361,8 @@ def render_message(role: str, content: str, extra_data: Optional[Dict] = None, m
                 with st.expander(f"📊 Result Data ({rc} rows)", expanded=True):
                     df = pd.DataFrame(extra_data["rows"], columns=extra_data["columns"])
                     st.dataframe(df, use_container_width=True, hide_index=True)
+                    if len(extra_data["rows"]) < rc:
+                        st.caption(f"Showing first {len(extra_data['rows'])} of {rc} rows")
             
             if extra_data.get("suggestions"):
                 st.markdown("**✨ Suggested Follow-ups:**")
@@ -394,6 +402,13 @@ def upload_database(file) -> Optional[Dict]:
         return res.json() if res.status_code == 200 else None
     except: return None
 
+def get_warm_state(session_id: str) -> Optional[Dict]:
+    """Fetch the background-generated starter questions for a session."""
+    try:
+        res = requests.get(f"{API_URL}/session/{session_id}/warm", timeout=5)
+        return res.json() if res.status_code == 200 else None
+    except: return None
+
 def send_question(session_id: str, question: str, is_clarification: bool = False) -> Optional[Dict]:
     try:
         payload = {"session_id": session_id, "question": question, "is_clarification": is_clarification}
@@ -419,6 +434,8 @@ def main():
         st.session_state.clicked_suggestion = None
     if "waiting_for_clarification" not in st.session_state:
         st.session_state.waiting_for_clarification = False
+    if "warm_polls" not in st.session_state:
+        st.session_state.warm_polls = {}
 
     # Sidebar
     with st.sidebar:
@@ -536,8 +553,20 @@ def main():
 
     # Initial Questions (Onboarding)
     # Don't show initial questions if a suggestion was just clicked
+    warming = False
     if not current_chat.get("messages") and not st.session_state.get("clicked_suggestion"):
         suggestions = current_chat.get("initial_questions", [])
+        if not suggestions and current_chat.get("session_id"):
+            # Generated after upload; fetch once they are ready
+            warm = get_warm_state(current_chat["session_id"])
+            if warm and warm.get("ready"):
+                suggestions = warm.get("initial_questions", [])
+                history = load_chat_history()
+                history["chats"][history["current_chat_id"]]["initial_questions"] = suggestions
+                save_chat_history(history)
+            else:
+                warming = True
+                st.caption("⏳ Preparing starter questions...")
         if suggestions:
             st.markdown("### 💡 Recommended Starter Questions")
             cols = st.columns(2)
@@ -596,5 +625,15 @@ def main():
             st.session_state.waiting_for_clarification = False
             st.rerun()
 
+    # Starter questions not ready yet: check again shortly (bounded, so a
+    # failed background task does not keep the page reloading)
+    if warming:
+        session_id = current_chat["session_id"]
+        polls = st.session_state.warm_polls.get(session_id, 0)
+        if polls < WARM_POLL_LIMIT:
+            st.session_state.warm_polls[session_id] = polls + 1
+            time.sleep(WARM_POLL_INTERVAL)
+            st.rerun()
+
 if __name__ == "__main__":
     main()
\ No newline at end of file
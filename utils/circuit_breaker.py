@@ -0,0 +1,105 @@
+"""
+Circuit breaker for calls to an upstream service (the LLM provider).
+
+After `fail_max` consecutive failures the breaker opens and calls are
+rejected immediately with CircuitOpenError for `reset_timeout` seconds.
+The first call after that is let through as a trial: success closes the
+breaker, failure opens it again.
+"""
+
+import asyncio
+import random
+import threading
+import time
+from typing import Awaitable, Callable, Optional, Tuple, Type, TypeVar
+
+
+T = TypeVar("T")
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the upstream while the breaker is open."""
+    pass
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        fail_max: int = 5,
+        reset_timeout: float = 30.0,
+        exclude: Tuple[Type[BaseException], ...] = ()
+    ):
+        """
+        Args:
+            fail_max: Consecutive failures that open the breaker
+            reset_timeout: Seconds to stay open before a trial call
+            exclude: Exceptions that mean the upstream answered (e.g. bad
+                output format) and do not count as failures
+        """
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self.exclude = exclude
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        with self._lock:
+            return self._opened_at is not None
+
+    def _before_call(self):
+        with self._lock:
+            if self._opened_at is None:
+                return
+            if self._trial_running or time.monotonic() - self._opened_at < self.reset_timeout:
+                raise CircuitOpenError("Upstream service is unavailable; try again shortly.")
+            self._trial_running = True
+
+    def _record(self, ok: bool):
+        with self._lock:
+            self._trial_running = False
+            if ok:
+                self._failures = 0
+                self._opened_at = None
+                return
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+
+    async def call(
+        self,
+        fn: Callable[..., Awaitable[T]],
+        *args,
+        timeout: Optional[float] = None,
+        **kwargs
+    ) -> T:
+        """
+        Awaits `fn(*args, **kwargs)` through the breaker, failing with
+        asyncio.TimeoutError after `timeout` seconds.
+
+        Raises:
+            CircuitOpenError: If the breaker is open
+        """
+        self._before_call()
+        try:
+            result = await asyncio.wait_for(fn(*args, **kwargs), timeout)
+        except self.exclude:
+            self._record(True)
+            raise
+        except asyncio.CancelledError:
+            # Caller gave up (e.g. a speculative retry was dropped); not a failure
+            with self._lock:
+                self._trial_running = False
+            raise
+        except Exception:
+            self._record(False)
+            raise
+        self._record(True)
+        return result
+
+
+def backoff_delay(attempt: int, base: float = 0.05, jitter: float = 0.05) -> float:
+    """Exponential backoff with jitter: base * 2**attempt + U(0, jitter)."""
+    return base * 2 ** attempt + random.uniform(0, jitter)